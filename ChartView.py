@@ -0,0 +1,59 @@
+"A module for the ChartView class"
+
+from PySide6.QtCharts import QChartView
+from PySide6.QtCore import Qt
+
+# how much one step of the mouse wheel zooms in
+WHEEL_ZOOM = 1.25
+
+class ChartView(QChartView):
+    """
+    A QChartView to explore a plot with the mouse: drag to pan, the wheel
+    zooms in and out, and a double click shows all of the data again.
+    """
+
+    def __init__(self, chart):
+        super().__init__(chart)
+        self.full_range = None  # (xmin, xmax, ymin, ymax) of all the data
+        self.last_pos = None  # of the mouse while dragging
+
+    def reset_view(self):
+        "show all of the data"
+        if self.full_range is None:
+            return
+        xmin, xmax, ymin, ymax = self.full_range
+        self.chart().axes(Qt.Horizontal)[0].setRange(xmin, xmax)
+        self.chart().axes(Qt.Vertical)[0].setRange(ymin, ymax)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.last_pos = event.position()
+            event.accept()
+            return
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self.last_pos is not None:
+            delta = event.position() - self.last_pos
+            self.last_pos = event.position()
+            self.chart().scroll(-delta.x(), delta.y())
+            event.accept()
+            return
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self.last_pos is not None:
+            self.last_pos = None
+            event.accept()
+            return
+        super().mouseReleaseEvent(event)
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.chart().zoom(WHEEL_ZOOM ** steps)
+        event.accept()
+
+    def mouseDoubleClickEvent(self, event):
+        self.reset_view()
+        event.accept()
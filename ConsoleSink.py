@@ -0,0 +1,131 @@
+"A module for the ConsoleSink class"
+
+import queue
+import logging
+import logging.handlers
+from collections import deque
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextCursor, QTextCharFormat, QColor
+from matplotlib.colors import to_hex
+
+from Tracer import tracer
+
+logger = logging.getLogger(__name__)
+# the console's messages, handed to the log handlers on a background thread
+console_logger = logger.getChild("console")
+
+# how often buffered messages are written to the console
+FLUSH_INTERVAL_MS = 100
+# lines kept in the console, older ones are dropped
+MAX_CONSOLE_LINES = 5000
+
+class ConsoleSink(QObject):
+    """
+    Collects console messages and writes them to a QPlainTextEdit in
+    batches on a timer: one document edit, and one re-layout, per batch
+    instead of one per message.  The console keeps only its last
+    max_lines lines, so its cost stays flat over a long session.
+    Messages are logged right away, through a queue to a listener thread
+    that does the (terminal) I/O of the log handlers, off the UI thread;
+    only writing them to the console waits.
+    """
+
+    # emitted with the number of messages written by each flush
+    flushed = Signal(int)
+
+    def __init__(self, text_edit, max_lines=MAX_CONSOLE_LINES, interval_ms=FLUSH_INTERVAL_MS):
+        super().__init__(text_edit)
+        self.text_edit = text_edit
+        self.text_edit.setMaximumBlockCount(max_lines)
+        self.text_edit.setUndoRedoEnabled(False)
+        # (message, color); when flushes fall behind the oldest are dropped
+        self.pending = deque(maxlen=max_lines)
+        self.formats = {}  # color -> QTextCharFormat
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+        self.scheduled = False  # is the timer running
+        self.empty = True  # nothing written to the console yet
+        # stays at the end of the console, where everything is appended
+        self.cursor = QTextCursor(self.text_edit.document())
+
+        # hand the records to the handlers set up so far (see logging.basicConfig)
+        self.log_listener = None
+        self.queue_handler = None
+        handlers = logging.getLogger().handlers
+        if handlers:
+            log_queue = queue.SimpleQueue()
+            self.queue_handler = logging.handlers.QueueHandler(log_queue)
+            console_logger.addHandler(self.queue_handler)
+            console_logger.propagate = False
+            self.log_listener = logging.handlers.QueueListener(
+                log_queue, *handlers, respect_handler_level=True)
+            self.log_listener.start()
+
+    def write(self, message, level=logging.INFO, color=None):
+        "log a message and queue it for the console's next flush"
+        message = str(message)
+        console_logger.log(level, message)
+        self.pending.append((message, color))
+        if not self.scheduled:
+            self.scheduled = True
+            self.timer.start()
+
+    def get_format(self, color):
+        "the character format for text of the given (matplotlib) color, None for the default"
+        text_format = self.formats.get(color)
+        if text_format is None:
+            text_format = QTextCharFormat()
+            if color is not None:
+                # plot line colors may be RGB(A) tuples
+                text_format.setForeground(QColor(to_hex(color)))
+            self.formats[color] = text_format
+        return text_format
+
+    def flush(self):
+        "write every queued message to the console in one edit"
+        if self.scheduled:
+            self.scheduled = False
+            self.timer.stop()
+        if not self.pending:
+            return
+        messages = list(self.pending)
+        self.pending.clear()
+        with tracer.span("console flush", lines=len(messages)):
+            self.write_messages(messages)
+
+    def write_messages(self, messages):
+        "appends the messages to the console, a line each, in one edit"
+        cursor = self.cursor
+        cursor.beginEditBlock()
+        # one insert per run of messages of the same color, each message
+        # a line of its own (a new block, see setMaximumBlockCount)
+        separator = "" if self.empty else "\n"
+        self.empty = False
+        run = []
+        run_color = None
+        for message, color in messages:
+            if run and color != run_color:
+                cursor.insertText(separator + "\n".join(run), self.get_format(run_color))
+                separator = "\n"
+                run = []
+            run.append(message)
+            run_color = color
+        cursor.insertText(separator + "\n".join(run), self.get_format(run_color))
+        cursor.endEditBlock()
+
+        scroll_bar = self.text_edit.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+        self.flushed.emit(len(messages))
+
+    def close(self):
+        "write what is queued, and log what is queued for the log handlers"
+        self.flush()
+        if self.log_listener is not None:
+            # stop() waits for the listener to handle every queued record
+            self.log_listener.stop()
+            self.log_listener = None
+            console_logger.removeHandler(self.queue_handler)
+            console_logger.propagate = True
@@ -4,6 +4,9 @@ from PySide6.QtWidgets import QVBoxLayout, QLabel
 
 from GfmTab import GfmTab
 from ScanData import ScanData
+from ScanPlots import CONTINUUM_LABELS
+from ScanPlots import DEFAULT_POLARIZATION
+from ScanPlots import polarizationPlot
 
 
 class ContCalibTab(GfmTab):
@@ -13,14 +16,13 @@ class ContCalibTab(GfmTab):
     def __init__(self, parent, scanData : ScanData, name : str, scanTypes : list):
         super().__init__(parent, scanData, name, scanTypes)
         layout = QVBoxLayout(self)
-        layout.addWidget(self.toolbar)
-        layout.addWidget(self.canvas)
+        layout.addWidget(self.plot_widget)
         self.setLayout(layout)
 
-        self.polarization = 'X'  # Default polarization
+        self.polarization = DEFAULT_POLARIZATION
 
         # these are the options available for continuum data
-        self.labels = ["beams", "pols", "phases", "freqs"]
+        self.labels = list(CONTINUUM_LABELS)
 
     def display_scan_data(self, currentScanIndex):
         # save which scan index was selected
@@ -30,47 +32,19 @@ class ContCalibTab(GfmTab):
         # scanData = getattr(self.parent, 'scanData', None)
         if self.scanData is None:
             return
-        # Try to get Y polarization data
+        # Try to get the selected polarization's data
         try:
-            scanNum = self.scanData.getScanNumByIndex(scanIndex)
-            x = self.scanData.getScanXDataByIndex(scanIndex)
-            # Try to find the key for Y polarization
-            opts = self.scanData.getScanOptions(scanIndex, self.labels)
-
             pol = self.polarization
-            key = self.get_key_for_pol(pol, opts)
-            y = self.scanData.getScanYDataByIndex(scanIndex, key)
-            # Plot using PlotData
-            self.update_plot(x, [y], [pol], "Time", "Power", f"Scan {scanNum} - {pol} Pol")
+            self.show_plot(
+                polarizationPlot(self.scanData, scanIndex, pol, self.labels),
+                cache_key=(scanIndex, pol)
+            )
         except Exception as e:
             pass
 
-    def get_key_for_pol(self, pol, opts):
-        # Find the key for polarization (case-insensitive)
-        pol_key = None
-        for k in opts:
-            if k.lower() == 'pols':
-                pol_key = k
-                break
-        if pol_key is None:
-            return
-        y_pols = opts[pol_key]
-        # Find the value for the given polarization
-        y_val = None
-        for v in y_pols:
-            if str(v).upper() == pol.upper():
-                y_val = v
-                break
-        if y_val is None:
-            return
-        # Build the key tuple for Y polarization (use first values for other options)
-        key = []
-        for k, vals in opts.items():
-            if k == pol_key:
-                key.append(y_val)
-            else:
-                key.append(vals[0])
-        return tuple(key)
+    def get_key_for_pol(self, scanIndex, pol):
+        "Find the key for the polarization (case-insensitive), using the first values for other options"
+        return self.scanData.getScanKeyForOption(scanIndex, self.labels, "pols", pol)
 
     def set_polarization(self, pol):
         """
@@ -2,6 +2,8 @@
 
 from ScanData import ScanData
 from OptionsTab import OptionsTab
+from ScanPlots import CONTINUUM_LABELS
+from ScanPlots import continuumPlot
 
 class ContinuumTab(OptionsTab):
 
@@ -17,37 +19,19 @@ class ContinuumTab(OptionsTab):
         scanData : ScanData,
         name : str,
         scanTypes : list,
+        plot_backend : str = "matplotlib",
     ):
-        super().__init__(parent, scanData, name, scanTypes)
+        super().__init__(parent, scanData, name, scanTypes, plot_backend)
 
         # these are the options available for continuum data
-        self.labels = ["beams", "pols", "phases", "freqs"]
+        self.labels = list(CONTINUUM_LABELS)
 
     def plot_data(self, scanIndex: int, optionsKeys: list):
         print("plot_data: ", scanIndex)
         self._last_scan_index = scanIndex
-        x = self.scanData.getScanXDataByIndex(scanIndex)
-        y_list = [self.scanData.getScanYDataByIndex(scanIndex, key) for key in optionsKeys]
-
-        # In-place refresh: clear only the axes, not the figure
-        if self.canvas and hasattr(self.canvas, "figure"):
-            fig = self.canvas.figure
-            if fig.axes:
-                ax = fig.axes[0]
-                ax.clear()
-            else:
-                ax = fig.add_subplot(111)
-        else:
-            from matplotlib.figure import Figure
-            fig = Figure(figsize=(4, 3))
-            ax = fig.add_subplot(111)
-            self.canvas.figure = fig
-
-        # Plot the new data
-        for y, label in zip(y_list, optionsKeys):
-            ax.plot(x, y, label=str(label))
-        ax.set_title(self.scanData.getScanShortDesc(scanIndex))
-        ax.set_xlabel("Time")
-        ax.set_ylabel("Power")
-        ax.legend()
-        self.canvas.draw()
\ No newline at end of file
+
+        # In-place refresh of the tab's canvas
+        self.show_plot(
+            continuumPlot(self.scanData, scanIndex, optionsKeys),
+            cache_key=(scanIndex, tuple(optionsKeys))
+        )
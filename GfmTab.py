@@ -1,18 +1,30 @@
 "A module for the GfmTab base class for GFM tabs."
 
+import logging
+
 from PySide6.QtWidgets import QWidget
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+from PySide6.QtWidgets import QStackedWidget
 
 from PlotData import PlotData
 from ScanData import ScanData
+from MatplotlibPlotBackend import MatplotlibPlotBackend
+from QtChartsPlotBackend import QtChartsPlotBackend
+from Tracer import tracer
+
+logger = logging.getLogger(__name__)
+
+# the backends a tab can draw its line plots with, see PlotBackend
+PLOT_BACKENDS = {
+    MatplotlibPlotBackend.name: MatplotlibPlotBackend,
+    QtChartsPlotBackend.name: QtChartsPlotBackend,
+}
 
 class GfmTab(QWidget):
     """
     Base class for all GFM tab widgets.
     Provides a common interface and shared logic for all tabs.
     """
-    def __init__(self, parent, scanData : ScanData, name : str, scanTypes : list):
+    def __init__(self, parent, scanData : ScanData, name : str, scanTypes : list, plot_backend : str = "matplotlib"):
         super().__init__(parent)
 
         self.gfm_window = parent
@@ -23,10 +35,31 @@ class GfmTab(QWidget):
         self.scanTypes = scanTypes
 
         # Shared matplotlib canvas and toolbar for all tabs
-        self.canvas = FigureCanvas()
-        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        self.matplotlib = MatplotlibPlotBackend(self.plot_cache, name)
+        self.canvas = self.matplotlib.canvas
+        self.toolbar = self.matplotlib.toolbar
+        # what line plots are drawn with, the matplotlib canvas is
+        # still there for what only matplotlib draws (images, grids)
+        if plot_backend == MatplotlibPlotBackend.name:
+            self.plot_backend = self.matplotlib
+        else:
+            self.plot_backend = PLOT_BACKENDS[plot_backend]()
+        self.plot_widget = QStackedWidget()
+        self.plot_widget.addWidget(self.matplotlib.widget())
+        if self.plot_backend is not self.matplotlib:
+            self.plot_widget.addWidget(self.plot_backend.widget())
 
         self.currentScanIndex = None  # To track the currently selected scan index
+        # a scan selected while the tab was hidden, rendered when it is shown
+        self.pending_scan_index = None
+
+    def set_scan_data(self, scanData : ScanData):
+        """
+        Called when a new project has been loaded.
+        """
+        self.scanData = scanData
+        self.currentScanIndex = None
+        self.pending_scan_index = None
 
     def display_scan_data(self, currentSelection):
         """
@@ -34,10 +67,10 @@ class GfmTab(QWidget):
         """
         raise NotImplementedError("display_scan_data must be implemented by subclasses.")
 
-    def update_plot(self, x, ys, ylabels, xaxis_label, yaxis_label, title):
+    def update_plot(self, x, ys, ylabels, xaxis_label, yaxis_label, title, text_xy=(0.75, 0.75), cache_key=None):
         """
-        Update the plot with new data.
-        Uses PlotData to actually create the plot figure, then refreshes the canvas and toolbar.
+        Update the plot with new data, see show_plot.
+        Returns the colour of each series.
         """
         plotter = PlotData(
             x=x,
@@ -45,23 +78,41 @@ class GfmTab(QWidget):
             labels=ylabels,
             xlabel=xaxis_label,
             ylabel=yaxis_label,
-            title=title
+            title=title,
+            text_xy=text_xy
         )
-        fig, _ = plotter.plot()
-        # Update canvas
-        parent_layout = self.canvas.parentWidget().layout()
-        if self.toolbar is not None:
-            parent_layout.removeWidget(self.toolbar)
-            self.toolbar.setParent(None)
-            self.toolbar.deleteLater()
-        if self.canvas is not None:
-            parent_layout.removeWidget(self.canvas)
-            self.canvas.setParent(None)
-            self.canvas.deleteLater()
-        self.canvas = FigureCanvas(fig)
-        self.toolbar = NavigationToolbar2QT(self.canvas, self)
-        parent_layout.addWidget(self.toolbar)
-        parent_layout.addWidget(self.canvas)
+        return self.show_plot(plotter, cache_key)
+
+    def show_plot(self, plotter : PlotData, cache_key=None):
+        """
+        Shows the PlotData with the tab's plot backend, see PlotBackend.
+        cache_key identifies the plot, e.g. for the window's PlotCache.
+        Returns the colour of each series.
+        """
+        if cache_key is not None:
+            cache_key = (self.name,) + tuple(cache_key)
+        with tracer.span("plot", tab=self.name, backend=self.plot_backend.name):
+            colours = self.plot_backend.show(plotter, cache_key)
+        self.plot_widget.setCurrentWidget(self.plot_backend.widget())
+        return colours
+
+    def use_canvas(self):
+        """
+        Shows the matplotlib canvas, for plots drawn on it directly.
+        Returns the canvas' figure.
+        """
+        self.plot_widget.setCurrentWidget(self.matplotlib.widget())
+        # the plot waiting to be drawn is not what ends up on the canvas
+        self.matplotlib.discard_stale()
+        return self.canvas.figure
+
+    @property
+    def plot_cache(self):
+        return self.gfm_window.plot_cache
+
+    def canvas_size(self):
+        "The size of the canvas' pixel buffer"
+        return self.matplotlib.canvas_size()
 
     def write_to_console(self, message, color=None):
         """
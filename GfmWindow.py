@@ -13,9 +13,22 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout
 from PySide6.QtWidgets import QTextEdit
 from PySide6.QtWidgets import QStatusBar
 from PySide6.QtWidgets import QFileDialog
-
-from ScanData import ScanData
+from PySide6.QtWidgets import QProgressBar
+from PySide6.QtWidgets import QLineEdit
+from PySide6.QtWidgets import QAbstractItemView
+from PySide6.QtWidgets import QPlainTextEdit
+from PySide6.QtWidgets import QLabel
+from PySide6.QtGui import QFont
+from PySide6.QtCore import QThread
+from PySide6.QtCore import QTimer
+
+from ProjectLoader import ProjectLoader
 from ScanListModel import ScanListModel
+from ScanFilterProxyModel import ScanFilterProxyModel
+from PlotCache import PlotCache
+from ConsoleSink import ConsoleSink
+from Tracer import tracer
+from LatencyMonitor import LatencyMonitor
 from ContinuumTab import ContinuumTab
 from PointingTab import PointingTab
 from FocusTab import FocusTab
@@ -24,6 +37,9 @@ from MenuBar import MenuBar
 
 logger = logging.getLogger(__name__)
 
+# how often the latency readout is refreshed
+LATENCY_READOUT_MS = 500
+
 class GfmWindow(QWidget):
 
     """
@@ -33,9 +49,22 @@ class GfmWindow(QWidget):
 
 
 
-    def __init__(self, project_name : str, app):
+    def __init__(
+        self,
+        project_name : str,
+        app,
+        data_file : str = "projData3.pkl",
+        scan_data_options : dict = None,
+        follow : bool = False,
+        plot_backend : str = "matplotlib",
+        perf_readout : bool = False,
+    ):
         super().__init__()
         self.project_name = project_name
+        # what the continuum and spectral tabs draw their line plots with
+        self.plot_backend = plot_backend
+        # keyword arguments for ScanData (dtype, cacheBytes, readAhead)
+        self.scan_data_options = scan_data_options or {}
         self.setWindowTitle("GFM - " + self.project_name)
 
         # Default options models for ContCalibOptionsDialog tabs
@@ -88,20 +117,52 @@ class GfmWindow(QWidget):
             print("Warning: Unable to determine screen geometry, using default size.")
             self.resize(1200, 400)
 
-        # Initialize components
-        fn = "projData3.pkl"
-        self.scanData = ScanData(fn, self.project_name)
+        # Initialize components; the project is loaded in the background
+        self.scanData = None
+        self.model = None
+        self.proxy_model = None
+        self.loader = None
+        # (thread, loader) of the loads still running, including cancelled
+        # ones, kept until their thread is done
+        self.loader_threads = []
+        self.load_id = 0
+
+        # follow mode polls the project data for newly written scans
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(1000)
+        self.follow_timer.timeout.connect(self.poll_new_scans)
+        self.follow = False
+        self.auto_select_newest = False
+
+        # rendered plots, shared by all tabs
+        self.plot_cache = PlotCache()
+
+        # the optional latency readout in the status bar, fed by tracer spans
+        self.latency_monitor = None
+        self.latency_version = None
+        self.latency_timer = QTimer(self)
+        self.latency_timer.setInterval(LATENCY_READOUT_MS)
+        self.latency_timer.timeout.connect(self.update_latency_readout)
 
         self.menubar = MenuBar(self, app, self.open_project, self.DIALOG_OPTIONS)
 
         # --- Tabbed panel setup ---
         self.tabs = QTabWidget()
 
-        # Initialize the scan list
+        # Initialize the scan list, filled in once the project is loaded
         self.scans_widget = QListView()
-        self.model = ScanListModel(self.scanData)
-        self.scans_widget.setModel(self.model)
-        self.scans_widget.selectionModel().currentChanged.connect(self.display_scan_data)
+        # several scans can be selected, e.g. to stack their spectra
+        self.scans_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        # and the filter bar above it
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("type:Peak source:3C286 scan:400-600 words")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(self.filter_scans)
+        scans_panel = QWidget()
+        scans_layout = QVBoxLayout(scans_panel)
+        scans_layout.setContentsMargins(0, 0, 0, 0)
+        scans_layout.addWidget(self.filter_edit)
+        scans_layout.addWidget(self.scans_widget)
         # self.firstScanSelected = False # TBF: kluge to avoid displaying the first scan on startup
 
 
@@ -113,6 +174,7 @@ class GfmWindow(QWidget):
             self.scanData,
             "Continuum",
             ["Peak", "Focus"],
+            self.plot_backend,
         )
         self.tabs.addTab(self.continuum_tab, "Continuum")
 
@@ -140,8 +202,10 @@ class GfmWindow(QWidget):
             self.scanData,
             "Spectral",
             ["spectral"],
+            self.plot_backend,
         )
         self.tabs.addTab(self.spectral_tab, "Spectral")
+        self.tabs.currentChanged.connect(self.render_current_tab)
 
         self.gfm_tabs = [
             self.continuum_tab,
@@ -152,7 +216,7 @@ class GfmWindow(QWidget):
 
         # separate tabs and the scan list with a splitter
         splitter = QSplitter(Qt.Horizontal)
-        splitter.addWidget(self.scans_widget)
+        splitter.addWidget(scans_panel)
         splitter.addWidget(self.tabs)
         splitter.setSizes([200, 600])
 
@@ -165,11 +229,16 @@ class GfmWindow(QWidget):
         )
         self.shell_tab.setText(shellTxt)
         self.shell_tab.setReadOnly(True)
-        self.console_tab = QTextEdit()
+        self.console_tab = QPlainTextEdit()
         self.console_tab.setReadOnly(True)
-        self.console_tab.setFontFamily("Courier New")
+        self.console_tab.setFont(QFont("Courier New"))
         self.bottom_tabs.addTab(self.console_tab, "Console")
         self.bottom_tabs.addTab(self.shell_tab, "Shell")
+        # console messages are written in batches, see ConsoleSink
+        self.console = ConsoleSink(self.console_tab)
+        self.console.flushed.connect(self.on_console_flushed)
+        self.unread_console_lines = 0
+        self.bottom_tabs.currentChanged.connect(self.on_bottom_tab_changed)
 
         # Add a vertical splitter between splitter and bottom_tabs
         vertical_splitter = QSplitter(Qt.Vertical)
@@ -185,24 +254,220 @@ class GfmWindow(QWidget):
         # Add status bar at the bottom
         self.status_bar = QStatusBar()
         self.status_bar.showMessage("Ready")
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 100)
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.hide()
+        self.status_bar.addPermanentWidget(self.load_progress)
+        self.latency_label = QLabel()
+        self.latency_label.hide()
+        self.status_bar.addPermanentWidget(self.latency_label)
         main_layout.addWidget(self.status_bar)
 
         self.setLayout(main_layout)
 
+        self.load_project(data_file)
+        self.set_follow_mode(follow)
+        self.set_perf_readout(perf_readout)
+
     def open_project(self):
         # Logic to open a project
         file_name, _ = QFileDialog.getOpenFileName(
             self,
             "Open Project Data File",
             "",
-            "Pickle Files (*.pkl);;All Files (*)"
+            "Project Files (*.pkl *.scans);;Pickle Files (*.pkl);;Scan Logs (*.scans);;Columnar Index (index.pkl);;All Files (*)"
         )
         if file_name:
-            self.scanData = ScanData(file_name, self.project_name)
-            self.model = ScanListModel(self.scanData)
-            self.scans_widget.setModel(self.model)
-            self.firstScanSelected = False
+            self.load_project(file_name)
+
+    def load_project(self, file_name):
+        """
+        Start loading the project data in a worker thread.
+        Any load still in progress is cancelled first.
+        """
+        self.cancel_load()
+        self.load_id += 1
+        thread = QThread(self)
+        self.loader = ProjectLoader(self.load_id, file_name, self.project_name, self.scan_data_options)
+        self.loader.moveToThread(thread)
+        thread.started.connect(self.loader.run)
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.loaded.connect(self.on_project_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loader.cancelled.connect(self.on_load_cancelled)
+        # quit from the loader's thread, the UI thread may be waiting on it
+        self.loader.finished.connect(thread.quit, Qt.DirectConnection)
+        self.loader.finished.connect(self.loader.deleteLater)
+        thread.finished.connect(self.on_loader_thread_finished)
+        thread.finished.connect(thread.deleteLater)
+        self.loader_threads.append((thread, self.loader))
+
+        self.status_bar.showMessage(f"Loading {file_name} ...")
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.menubar.cancel_action.setEnabled(True)
+        thread.start()
+
+    def cancel_load(self):
+        "Cancel the project load in progress, if any"
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+
+    def on_loader_thread_finished(self):
+        "Forget a loader thread that is done"
+        thread = self.sender()
+        self.loader_threads = [entry for entry in self.loader_threads if entry[0] is not thread]
+
+    def on_load_finished(self):
+        "Reset the UI once the current load is over, however it ended"
+        self.loader = None
+        self.load_progress.hide()
+        self.menubar.cancel_action.setEnabled(False)
+
+    def on_load_progress(self, load_id, percent, message):
+        if load_id != self.load_id:
+            return
+        self.load_progress.setValue(percent)
+        self.status_bar.showMessage(f"{message} ({percent}%)")
 
+    def on_project_loaded(self, load_id, scanData):
+        if load_id != self.load_id:
+            scanData.close()
+            return
+        self.on_load_finished()
+        self.set_scan_data(scanData)
+        message = f"Loaded {scanData.numScans} scans"
+        if scanData.numFixedRecords:
+            message += f", {scanData.numFixedRecords} records fixed"
+        self.status_bar.showMessage(message)
+
+    def on_load_failed(self, load_id, message):
+        if load_id != self.load_id:
+            return
+        self.on_load_finished()
+        self.write_to_console(f"Could not load project: {message}", level=logging.ERROR, color="red")
+        self.status_bar.showMessage("Loading failed")
+
+    def on_load_cancelled(self, load_id):
+        if load_id != self.load_id:
+            return
+        self.on_load_finished()
+        self.status_bar.showMessage("Loading cancelled")
+
+    def set_scan_data(self, scanData):
+        "Show the scans of a newly loaded project"
+        if self.scanData is not None:
+            self.scanData.close()
+        self.scanData = scanData
+        self.plot_cache.clear()
+        for tab in self.gfm_tabs:
+            tab.set_scan_data(scanData)
+        self.model = ScanListModel(self.scanData)
+        self.proxy_model = ScanFilterProxyModel(self.model)
+        self.proxy_model.setQuery(self.filter_edit.text())
+        self.scans_widget.setModel(self.proxy_model)
+        self.scans_widget.selectionModel().currentChanged.connect(self.display_scan_data)
+        self.firstScanSelected = False
+        # only scan logs are appended to while observing
+        self.menubar.follow_action.setEnabled(self.scanData.store.canFollow)
+        if self.follow:
+            self.set_follow_mode(True)
+
+    def set_follow_mode(self, follow):
+        "Start or stop watching the project data for new scans"
+        if follow and self.scanData is not None and not self.scanData.store.canFollow:
+            self.write_to_console(
+                "Follow mode needs a scan log that scans are written to, e.g. --data project.scans; "
+                "this project was not loaded from one",
+                level=logging.WARNING, color="red"
+            )
+            follow = False
+        self.follow = follow
+        if follow:
+            self.follow_timer.start()
+        else:
+            self.follow_timer.stop()
+        self.menubar.follow_action.setChecked(follow)
+
+    def set_auto_select_newest(self, auto_select):
+        "Whether follow mode selects each new scan as it arrives"
+        self.auto_select_newest = auto_select
+        self.menubar.auto_select_action.setChecked(auto_select)
+
+    def set_perf_readout(self, enabled):
+        "Show or hide the time spent fetching, building options, plotting and drawing"
+        if enabled and self.latency_monitor is None:
+            self.latency_monitor = LatencyMonitor()
+            tracer.addListener(self.latency_monitor.onSpan)
+            self.latency_version = None
+            self.latency_label.setText("no selection timed yet")
+            self.latency_label.show()
+            self.latency_timer.start()
+        elif not enabled and self.latency_monitor is not None:
+            self.latency_timer.stop()
+            tracer.removeListener(self.latency_monitor.onSpan)
+            self.latency_monitor = None
+            self.latency_label.hide()
+        self.menubar.perf_action.setChecked(enabled)
+
+    def update_latency_readout(self):
+        "Refresh the latency readout, including draws done since the selection"
+        monitor = self.latency_monitor
+        monitor.poll()
+        if monitor.version == self.latency_version:
+            return
+        self.latency_version = monitor.version
+        self.latency_label.setText(f"{monitor.summary()} | cache {self.cache_megabytes():.0f} MB")
+        self.latency_label.setToolTip(f"{monitor.details()}\n{self.cache_usage()}")
+
+    def cache_usage(self):
+        "The memory used by the scan, integration sum and plot caches"
+        lines = []
+        if self.scanData is not None:
+            lines.append(f"scans: {self.scanData.cache.stats()['bytes'] / 2**20:.1f} MB")
+            lines.append(f"integration sums: {self.scanData.integrationSumsBytes / 2**20:.1f} MB")
+        lines.append(f"plots: {self.plot_cache.nbytes / 2**20:.1f} MB")
+        return "\n".join(lines)
+
+    def cache_megabytes(self):
+        total = self.plot_cache.nbytes
+        if self.scanData is not None:
+            total += self.scanData.cache.stats()["bytes"] + self.scanData.integrationSumsBytes
+        return total / 2**20
+
+    def poll_new_scans(self):
+        "Add any newly written scans to the end of the scan list"
+        if self.model is None or self.loader is not None:
+            return
+        num_new = self.model.refresh()
+        if num_new == 0:
+            return
+        self.proxy_model.refresh()
+        self.status_bar.showMessage(f"{num_new} new scans, {self.scanData.numScans} in total")
+        if self.auto_select_newest:
+            self.model.fetchAll()
+            newest = self.proxy_model.mapFromSource(self.model.index(self.model.rowCount() - 1, 0))
+            if newest.isValid():
+                self.scans_widget.setCurrentIndex(newest)
+                self.scans_widget.scrollTo(newest)
+
+    def filter_scans(self, query):
+        "Show only the scans matching the filter bar query"
+        if self.proxy_model is not None:
+            self.proxy_model.setQuery(query)
+
+    def closeEvent(self, event):
+        "Don't leave loader threads running behind"
+        self.follow_timer.stop()
+        self.set_perf_readout(False)
+        self.cancel_load()
+        for thread, loader in self.loader_threads:
+            loader.cancel()
+            thread.wait()
+        self.console.close()
+        super().closeEvent(event)
 
     def display_scan_data(self, current, previous):
         # keep the first scan from being displayed on startup
@@ -211,7 +476,10 @@ class GfmWindow(QWidget):
         #     self.firstScanSelected = True
         #     return
         # get the scan type from the scanIndex
-        scanIndex = current.row()
+        if not current.isValid():
+            return
+        # the list shows the filtered scans, get the index into ScanData
+        scanIndex = self.proxy_model.mapToSource(current).row()
         # scanType = self.scanData.getScanDataByIndex(scanIndex)['scanType']
         scanInfo = self.scanData.getScanDataByIndex(scanIndex)
         scanType = scanInfo['scanType'] if 'scanType' in scanInfo else 'unknown'
@@ -225,38 +493,81 @@ class GfmWindow(QWidget):
 
         # desc = self.scanData.getScanFullDesc(scanIndex)
 
-        for tab in self.gfm_tabs:
-            idx = self.tabs.indexOf(tab)
-            if scanType in tab.scanTypes:
-                if hasattr(tab, 'display_scan_data'):
-                    tab.display_scan_data(current.row())
-                self.tabs.setCurrentWidget(tab)
-                self.tabs.tabBar().setTabTextColor(idx, Qt.blue)
-                # self.tabs.setTabText(idx, f"<b>{label}</b>")
-            else:
-                # reset txt to normal
-                self.tabs.tabBar().setTabTextColor(idx, Qt.black)
-                # self.tabs.setTabText(idx, f"{label}")
+        with tracer.span("select scan", index=scanIndex, scanType=scanType):
+            matching_tabs = [tab for tab in self.gfm_tabs if scanType in tab.scanTypes]
+            for tab in self.gfm_tabs:
+                idx = self.tabs.indexOf(tab)
+                if tab in matching_tabs:
+                    # only the visible tab renders now, the others when they are shown
+                    tab.pending_scan_index = scanIndex
+                    self.tabs.tabBar().setTabTextColor(idx, Qt.blue)
+                    # self.tabs.setTabText(idx, f"<b>{label}</b>")
+                else:
+                    # reset txt to normal
+                    self.tabs.tabBar().setTabTextColor(idx, Qt.black)
+                    # self.tabs.setTabText(idx, f"{label}")
+            if matching_tabs:
+                self.tabs.setCurrentWidget(matching_tabs[-1])
+            # in case it already was the current tab
+            self.render_current_tab()
+
+        # get the neighbours in the (filtered) list ready while the user looks at this scan
+        self.scanData.prefetch(self.neighbour_scan_indexes(current))
+        logger.debug(f"scan cache: {self.scanData.cache.stats()}")
+        logger.debug(f"plot cache: {self.plot_cache.stats()}")
 
         self.status_bar.showMessage("Ready")
 
+    def render_current_tab(self, index=None):
+        "Render the scan selected for the current tab while it was hidden, if any"
+        tab = self.tabs.currentWidget()
+        scanIndex = getattr(tab, "pending_scan_index", None)
+        if scanIndex is None:
+            return
+        tab.pending_scan_index = None
+        with tracer.span("render tab", tab=tab.name, index=scanIndex):
+            tab.display_scan_data(scanIndex)
+
+    def selected_scan_indexes(self):
+        "The scan indexes of the rows selected in the (filtered) list, in list order"
+        if self.proxy_model is None:
+            return []
+        rows = sorted(index.row() for index in self.scans_widget.selectionModel().selectedRows())
+        return [self.proxy_model.mapToSource(self.proxy_model.index(row, 0)).row() for row in rows]
+
+    def neighbour_scan_indexes(self, current):
+        "The scan indexes of the rows before and after the current one, nearest first"
+        rows = []
+        for offset in range(1, self.scanData.cache.readAhead + 1):
+            rows.extend([current.row() + offset, current.row() - offset])
+        num_rows = self.proxy_model.rowCount()
+        return [
+            self.proxy_model.mapToSource(self.proxy_model.index(row, 0)).row()
+            for row in rows if 0 <= row < num_rows
+        ]
+
     def write_to_console(self, message, level=logging.INFO, color=None):
         """
         Write a message to the console (or log).
         """
-        if not hasattr(self, 'bottom_tabs'):
+        if not hasattr(self, 'console'):
             return
-        self.bottom_tabs.setCurrentWidget(self.console_tab)
-        print(message)
-        logger.log(level, message)
-
-        # black is the default color
-        if color is None:
-            # color = '#00000000'
-            color = '#FFFF'
+        # Append the message in the specified color (None for the default)
+        # to the console_tab, with the next batch
+        self.console.write(message, level, color)
 
-        # Append the message in the specified color to the console_tab
-        self.console_tab.append(f'<span style="color:{color};">{message}</span>')
+    def on_console_flushed(self, num_lines):
+        "Count the console lines written while another bottom tab is showing"
+        if self.bottom_tabs.currentWidget() is self.console_tab:
+            return
+        self.unread_console_lines += num_lines
+        idx = self.bottom_tabs.indexOf(self.console_tab)
+        self.bottom_tabs.setTabText(idx, f"Console ({self.unread_console_lines})")
+
+    def on_bottom_tab_changed(self, index):
+        if self.bottom_tabs.widget(index) is self.console_tab:
+            self.unread_console_lines = 0
+            self.bottom_tabs.setTabText(index, "Console")
 
 
     # def on_option_checkbox_changed(self):
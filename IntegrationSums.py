@@ -0,0 +1,56 @@
+"A module for the IntegrationSums class"
+
+import numpy as np
+
+class IntegrationSums:
+    """
+    Running sums over the integrations of one spectral series, so the
+    average of any range of integrations costs one subtraction per channel,
+    however many integrations it spans.
+    Optionally weighted by the exposure of each integration.
+    NaN (flagged) samples are left out of the averages, a channel is only
+    NaN where none of the integrations in the range has a valid sample.
+    """
+
+    def __init__(self, data, exposure=None):
+        data = np.atleast_2d(data)  # (integrations, channels)
+        self.numIntegrations = data.shape[0]
+        valid = np.isfinite(data)
+        values = np.nan_to_num(data, nan=0.0, posinf=0.0, neginf=0.0)
+        # sums[i] is the sum of the first i integrations, counts[i] the
+        # number of valid samples in them, per channel
+        self.sums = self.runningSums(values)
+        self.counts = self.runningSums(valid, np.int32)
+        self.weightedSums = None
+        self.weights = None
+        if exposure is not None:
+            exposure = np.asarray(exposure, dtype=np.float64)[:, np.newaxis]
+            self.weightedSums = self.runningSums(values * exposure)
+            # the exposure of the valid samples only, per channel
+            self.weights = self.runningSums(valid * exposure)
+
+    @staticmethod
+    def runningSums(data, dtype=np.float64):
+        sums = np.zeros((data.shape[0] + 1,) + data.shape[1:], dtype=dtype)
+        np.cumsum(data, axis=0, dtype=dtype, out=sums[1:])
+        return sums
+
+    @property
+    def nbytes(self):
+        nbytes = self.sums.nbytes + self.counts.nbytes
+        if self.weightedSums is not None:
+            nbytes += self.weightedSums.nbytes + self.weights.nbytes
+        return nbytes
+
+    def average(self, first, last, weighted=False):
+        "returns the average of integrations first to last, inclusive"
+        first = min(max(first, 0), self.numIntegrations - 1)
+        last = min(max(last, first), self.numIntegrations - 1)
+        count = self.counts[last + 1] - self.counts[first]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.where(count > 0, (self.sums[last + 1] - self.sums[first]) / count, np.nan)
+            if weighted and self.weightedSums is not None:
+                total = self.weights[last + 1] - self.weights[first]
+                # channels with no exposure keep the plain average
+                average = np.where(total > 0, (self.weightedSums[last + 1] - self.weightedSums[first]) / total, average)
+        return average
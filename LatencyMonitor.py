@@ -0,0 +1,159 @@
+"A module for the LatencyMonitor class"
+
+import threading
+from collections import deque
+
+import numpy as np
+
+# the spans timed for the readout, and the stage each one is counted in
+STAGES = {
+    "fetch scan": "fetch",
+    "build options": "options",
+    "key combinations": "options",
+    "plot": "plot",
+    "canvas draw": "draw",
+}
+STAGE_ORDER = ("fetch", "options", "plot", "draw")
+# selections the rolling percentiles are taken over
+ROLLING_SELECTIONS = 500
+
+class LatencyMonitor:
+    """
+    Listens to the tracer's spans (see Tracer.addListener) and breaks the
+    time of the last scan selection down into data fetch, option building,
+    plotting and drawing for each tab that rendered, with the rolling
+    median and 95th percentile of each stage over the session.
+
+    Only spans of the main thread are counted.  Spans are kept until the
+    "select scan" span they belong to ends, or until poll() is called from
+    the event loop, which can't happen while a selection is being handled;
+    canvas draws that happen after a selection are added to it that way.
+    A tab rendered outside a selection (one shown after the scan was
+    selected) is counted as a selection of its own.
+    """
+
+    def __init__(self, maxSelections=ROLLING_SELECTIONS):
+        self.pending = []  # (name, tab, start, end, scan index) of spans not counted yet
+        self.last = None  # tab -> stage -> ms, of the last selection
+        self.lastIndex = None
+        self.samples = {stage: deque(maxlen=maxSelections) for stage in STAGE_ORDER + ("total",)}
+        self.version = 0  # changes whenever the readout does
+
+    def onSpan(self, name, start, end, args):
+        "the tracer listener"
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if name == "select scan":
+            self.endSelection(start, args.get("index"))
+        elif name in STAGES or name == "render tab":
+            self.pending.append((name, args.get("tab"), start, end, args.get("index")))
+
+    def endSelection(self, start, scanIndex):
+        "starts a new breakdown with the spans of the selection that began at start"
+        previous = [span for span in self.pending if span[3] <= start]
+        spans = [span for span in self.pending if span[3] > start]
+        self.pending = previous
+        self.poll()
+        self.newSelection(scanIndex)
+        self.count(spans)
+
+    def newSelection(self, scanIndex):
+        "adds the last selection to the rolling samples and starts the next"
+        if self.last is not None:
+            self.addSamples(self.last)
+        self.last = {}
+        self.lastIndex = scanIndex
+        self.version += 1
+
+    def poll(self):
+        """
+        Adds the spans since the last selection (e.g. deferred draws) to it,
+        or to the tabs rendered since, when they were shown.
+        """
+        if not self.pending:
+            return
+        spans = sorted(self.pending, key=lambda span: span[2])
+        self.pending = []
+        # the outermost renders, each a selection of its own
+        renders = [span for span in spans if span[0] == "render tab"]
+        renders = [r for r in renders if not any(o is not r and o[2] <= r[2] and r[3] <= o[3] for o in renders)]
+        starts = [r[2] for r in renders] + [float("inf")]
+        before = [span for span in spans if span[2] < starts[0]]
+        if before and self.last is not None:
+            self.count(before)
+            self.version += 1
+        for render, nextStart in zip(renders, starts[1:]):
+            self.newSelection(render[4])
+            self.count([span for span in spans if render[2] <= span[2] < nextStart])
+
+    def count(self, spans):
+        "adds the time of the spans to the stages of the last selection"
+        renders = [span for span in spans if span[0] == "render tab"]
+        for render in renders:
+            # listed even when nothing was fetched, plotted or drawn, e.g. a blit
+            self.last.setdefault(render[1], dict.fromkeys(STAGE_ORDER, 0.0))
+        timed = [span for span in spans if span[0] in STAGES]
+        for span in timed:
+            name, tab, start, end = span[:4]
+            if tab is None:
+                # e.g. a scan fetch, counted for the tab rendering at the time
+                tab = next((r[1] for r in renders if r[2] <= start and end <= r[3]), None)
+                if tab is None:
+                    continue
+            stages = self.last.setdefault(tab, dict.fromkeys(STAGE_ORDER, 0.0))
+            stages[STAGES[name]] += (end - start - self.nestedTime(span, timed)) / 1e6
+
+    @staticmethod
+    def nestedTime(span, spans):
+        "the time of the spans directly nested in span, e.g. a scan fetch while building options"
+        inner = [other for other in spans
+                 if other is not span and span[2] <= other[2] and other[3] <= span[3]]
+        # leave out the spans nested in other inner spans
+        return sum(other[3] - other[2] for other in inner
+                   if not any(o is not other and o[2] <= other[2] and other[3] <= o[3] for o in inner))
+
+    def addSamples(self, selection):
+        "adds the stage times of a selection, summed over its tabs, to the rolling samples"
+        totals = self.totals(selection)
+        for stage, ms in totals.items():
+            self.samples[stage].append(ms)
+
+    @staticmethod
+    def totals(selection):
+        totals = {stage: sum(stages[stage] for stages in selection.values()) for stage in STAGE_ORDER}
+        totals["total"] = sum(totals.values())
+        return totals
+
+    def percentiles(self, stage):
+        "returns the rolling (p50, p95) of a stage (or 'total') in ms, None before any selection"
+        samples = list(self.samples[stage])
+        if self.last is not None:
+            samples.append(self.totals(self.last)[stage])
+        if not samples:
+            return None
+        p50, p95 = np.percentile(samples, [50, 95])
+        return float(p50), float(p95)
+
+    def numSelections(self):
+        return len(self.samples["total"]) + (self.last is not None)
+
+    def summary(self):
+        "one line: the stages of the last selection by tab, and the rolling percentiles of its total"
+        if self.last is None:
+            return "no selection timed yet"
+        parts = []
+        for tab, stages in self.last.items():
+            times = " ".join(f"{stage} {stages[stage]:.0f}" for stage in STAGE_ORDER)
+            parts.append(f"{tab}: {times} ms")
+        p50, p95 = self.percentiles("total")
+        parts.append(f"p50 {p50:.0f} p95 {p95:.0f} ms over {self.numSelections()}")
+        return " | ".join(parts)
+
+    def details(self):
+        "the rolling percentiles of every stage, one per line"
+        lines = []
+        for stage in STAGE_ORDER + ("total",):
+            p = self.percentiles(stage)
+            if p is not None:
+                lines.append(f"{stage}: p50 {p[0]:.1f} ms, p95 {p[1]:.1f} ms")
+        return "\n".join(lines)
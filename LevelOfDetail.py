@@ -0,0 +1,121 @@
+"A module for the LevelOfDetail class"
+
+import numpy as np
+
+# points kept per pixel of axes width: the min and max of each pixel column
+POINTS_PER_PIXEL = 2
+
+def minMaxDecimate(x, y, numBins, lo=0, hi=None):
+    """
+    Reduces y[lo:hi] to the minimum and maximum of each of about numBins
+    bins, kept in their original order so spikes survive.
+    Returns the x and y of the points kept.
+    """
+    if hi is None:
+        hi = len(y)
+    count = hi - lo
+    if count <= POINTS_PER_PIXEL * numBins:
+        return x[lo:hi], y[lo:hi]
+    binSize = -(-count // numBins)  # ceil
+    numFull = count // binSize
+    end = lo + numFull * binSize
+    bins = y[lo:end].reshape(numFull, binSize)
+    iMin = np.argmin(bins, axis=1)
+    iMax = np.argmax(bins, axis=1)
+    starts = lo + np.arange(numFull) * binSize
+    idx = np.empty((numFull, 2), dtype=np.intp)
+    idx[:, 0] = starts + np.minimum(iMin, iMax)
+    idx[:, 1] = starts + np.maximum(iMin, iMax)
+    idx = idx.ravel()
+    if end < hi:
+        # the partial bin at the end
+        tail = y[end:hi]
+        idx = np.concatenate([idx, end + np.sort([np.argmin(tail), np.argmax(tail)])])
+    return x[idx], y[idx]
+
+def blockAverage(data, maxRows, maxCols):
+    """
+    Reduces a 2D array to at most maxRows x maxCols by averaging blocks
+    of neighbouring values (the last block of each axis may be smaller).
+    Returns the array itself when it already fits.
+    """
+    data = np.asarray(data)
+    for axis, maxSize in enumerate((maxRows, maxCols)):
+        size = data.shape[axis]
+        maxSize = max(int(maxSize), 1)
+        if size <= maxSize:
+            continue
+        blockSize = -(-size // maxSize)  # ceil
+        starts = np.arange(0, size, blockSize)
+        counts = np.diff(np.append(starts, size))
+        sums = np.add.reduceat(data, starts, axis=axis, dtype=np.float64)
+        shape = [1, 1]
+        shape[axis] = len(counts)
+        data = sums / counts.reshape(shape)
+    return data
+
+
+class LevelOfDetail:
+    """
+    Keeps the full resolution data of the lines of one matplotlib axes and
+    shows each of them decimated to about two points per pixel of the
+    axes width.  The visible x range is decimated again from the full data
+    whenever the view changes (zoom, pan, home...) or the canvas is
+    resized, so detail comes back on zooming in or enlarging the window
+    while draw time no longer depends on the number of points.
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.series = []  # (line, full x, full y, x is increasing)
+        self.callbacks = None  # the registry we are connected to
+        self.cid = None
+        self.canvas = None  # the canvas whose resizes we follow
+        self.numBins = None  # the axes width the lines were decimated for
+
+    @staticmethod
+    def forAxes(ax):
+        "returns the LevelOfDetail of the given axes, creating it if needed"
+        lod = getattr(ax, "levelOfDetail", None)
+        if lod is None:
+            lod = LevelOfDetail(ax)
+            ax.levelOfDetail = lod
+        return lod
+
+    def setSeries(self, lines, x, y_list):
+        "gives the full resolution data of each line, which is then shown decimated"
+        x = np.asarray(x)
+        increasing = bool(len(x) < 2 or np.all(x[1:] >= x[:-1]))
+        self.series = [(line, x, np.asarray(y), increasing) for line, y in zip(lines, y_list)]
+        # clearing the axes replaces its callback registry
+        if self.callbacks is not self.ax.callbacks:
+            self.callbacks = self.ax.callbacks
+            self.cid = self.callbacks.connect("xlim_changed", self.on_xlim_changed)
+        canvas = self.ax.figure.canvas
+        if self.canvas is not canvas:
+            # canvas callbacks hold bound methods weakly, so this goes with the axes
+            self.canvas = canvas
+            canvas.mpl_connect("resize_event", self.on_resize)
+        self.update()
+
+    def on_xlim_changed(self, ax):
+        self.update(ax.get_xlim())
+
+    def on_resize(self, event):
+        "decimates again for the new axes width, before the resized canvas is drawn"
+        if self.series and max(int(self.ax.bbox.width), 1) != self.numBins:
+            self.update(self.ax.get_xlim())
+
+    def update(self, xlim=None):
+        "shows the given x range (all of it for None) decimated to the axes width"
+        numBins = max(int(self.ax.bbox.width), 1)
+        self.numBins = numBins
+        for line, x, y, increasing in self.series:
+            lo, hi = 0, len(y)
+            if xlim is not None and increasing and hi > 0:
+                xmin, xmax = sorted(xlim)
+                # keep a point past each edge so lines run off the axes
+                lo = max(int(np.searchsorted(x, xmin, side="left")) - 1, 0)
+                hi = min(int(np.searchsorted(x, xmax, side="right")) + 1, len(y))
+            xd, yd = minMaxDecimate(x, y, numBins, lo, hi)
+            line.set_data(xd, yd)
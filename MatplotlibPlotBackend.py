@@ -0,0 +1,160 @@
+"A module for the MatplotlibPlotBackend class"
+
+import time
+import logging
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+
+from PlotBackend import PlotBackend
+from PlotCache import PlotCache
+from Tracer import tracer
+
+logger = logging.getLogger(__name__)
+
+class TracedFigureCanvas(FigureCanvas):
+    """
+    A canvas whose full redraws show up as spans of the tracer.
+    before_use, if set, is called before the canvas draws or handles
+    mouse and key events, e.g. to bring stale artists up to date.
+    """
+
+    def __init__(self, tab=None):
+        super().__init__()
+        self.tab = tab  # the tab the canvas is drawn for
+        self.before_use = None
+
+    def use(self):
+        if self.before_use is not None:
+            self.before_use()
+
+    def draw(self):
+        self.use()
+        with tracer.span("canvas draw", tab=self.tab):
+            super().draw()
+
+    def mousePressEvent(self, event):
+        # e.g. the toolbar's zoom and pan need the axes of what is shown
+        self.use()
+        super().mousePressEvent(event)
+
+    def wheelEvent(self, event):
+        self.use()
+        super().wheelEvent(event)
+
+    def keyPressEvent(self, event):
+        self.use()
+        super().keyPressEvent(event)
+
+class MatplotlibPlotBackend(PlotBackend):
+    """
+    Draws PlotData on a matplotlib canvas with its navigation toolbar.
+    The lines of the canvas' one axes are updated in place, and plots
+    drawn before are restored from a PlotCache when one is given; the
+    lines are then only updated when the canvas is next used.
+    """
+
+    name = "matplotlib"
+
+    def __init__(self, plot_cache : PlotCache = None, tab : str = None):
+        self.plot_cache = plot_cache
+        self.panel = QWidget()
+        self.canvas = TracedFigureCanvas(tab)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self.panel)
+        layout = QVBoxLayout(self.panel)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.canvas)
+
+        # time from asking for a redraw to the canvas being drawn
+        self.redraw_start = None
+        self.last_redraw_ms = None
+        # cache key of the plot waiting to be drawn, see PlotCache
+        self.pending_cache_key = None
+        self.pending_colours = None
+        # the PlotData shown from the cache, not yet in the artists
+        self.stale_plotter = None
+        self.canvas.before_use = self.update_artists
+        self.canvas.mpl_connect("draw_event", self.on_canvas_drawn)
+
+    def widget(self):
+        return self.panel
+
+    def show(self, plotter, cache_key=None):
+        """
+        Uses the PlotData to update the lines of the canvas in place,
+        then asks for a redraw on the next event loop pass.
+        If cache_key is given and the plot was drawn before at this canvas
+        size, its pixels are restored from the PlotCache instead, and the
+        lines are only updated when the canvas is next drawn or used.
+        """
+        self.redraw_start = time.perf_counter()
+        cached = None
+        if cache_key is not None and self.plot_cache is not None:
+            cached = self.plot_cache.get(cache_key, self.canvas_size())
+        else:
+            cache_key = None
+        # reset the toolbar's zoom history for the new data
+        self.toolbar.update()
+        self.stale_plotter = plotter
+
+        if cached is not None:
+            pixels, colours = cached
+            self.pending_cache_key = None
+            self.canvas.restore_region(pixels)
+            self.canvas.blit(self.canvas.figure.bbox)
+            self.on_canvas_drawn(None)
+            return colours
+
+        lines = self.update_artists()
+        colours = [line.get_color() for line in lines]
+        self.pending_cache_key = cache_key
+        self.pending_colours = colours
+        self.canvas.draw_idle()
+        return colours
+
+    def update_artists(self):
+        "updates the lines of the canvas with the PlotData shown last, if they are stale; returns them"
+        plotter = self.stale_plotter
+        if plotter is None:
+            return None
+        self.stale_plotter = None
+        fig = self.canvas.figure
+        if len(fig.axes) != 1:
+            # e.g. the pointing grid was showing
+            fig.clear()
+            fig.add_subplot(111)
+        return plotter.update(fig.axes[0])
+
+    def discard_stale(self):
+        "forgets the plot waiting for its artists, for figures drawn on directly"
+        self.stale_plotter = None
+        self.pending_cache_key = None
+
+    def set_x_range(self, xmin, xmax):
+        self.update_artists()
+        for ax in self.canvas.figure.axes:
+            ax.set_xlim(xmin, xmax)
+        self.canvas.draw_idle()
+
+    def render(self):
+        self.canvas.draw()
+        self.canvas.repaint()
+
+    def canvas_size(self):
+        "The size of the canvas' pixel buffer"
+        return self.canvas.get_width_height(physical=True)
+
+    def on_canvas_drawn(self, event):
+        "Record how long the last redraw took, and cache what was drawn"
+        if self.pending_cache_key is not None:
+            fig = self.canvas.figure
+            pixels = self.canvas.copy_from_bbox(fig.bbox)
+            self.plot_cache.put(self.pending_cache_key, self.canvas_size(), (pixels, self.pending_colours))
+            self.pending_cache_key = None
+        if self.redraw_start is None:
+            return
+        self.last_redraw_ms = 1000 * (time.perf_counter() - self.redraw_start)
+        self.redraw_start = None
+        logger.debug(f"redraw took {self.last_redraw_ms:.1f} ms")
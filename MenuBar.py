@@ -20,6 +20,28 @@ class MenuBar(QMenuBar):
         open_action.triggered.connect(open_action_handler)
         file_menu.addAction(open_action)
 
+        # Cancel a project load in progress
+        cancel_action = QAction('Cancel Loading', self)
+        cancel_action.triggered.connect(window.cancel_load)
+        cancel_action.setEnabled(False)
+        file_menu.addAction(cancel_action)
+
+        # Follow mode: pick up scans as they are written during observing
+        follow_action = QAction('Follow Project', self)
+        follow_action.setCheckable(True)
+        follow_action.toggled.connect(window.set_follow_mode)
+        file_menu.addAction(follow_action)
+        auto_select_action = QAction('Select Newest Scan', self)
+        auto_select_action.setCheckable(True)
+        auto_select_action.toggled.connect(window.set_auto_select_newest)
+        file_menu.addAction(auto_select_action)
+
+        # Latency breakdown of each selection in the status bar
+        perf_action = QAction('Show Timings', self)
+        perf_action.setCheckable(True)
+        perf_action.toggled.connect(window.set_perf_readout)
+        file_menu.addAction(perf_action)
+
         # Exit action
         exit_action = QAction('Exit', self)
         exit_action.triggered.connect(app.quit)
@@ -52,6 +74,10 @@ class MenuBar(QMenuBar):
 
         # Expose actions for external use if needed
         self.open_action = open_action
+        self.cancel_action = cancel_action
+        self.follow_action = follow_action
+        self.auto_select_action = auto_select_action
+        self.perf_action = perf_action
         self.exit_action = exit_action
         self.help_action = help_action
 
@@ -3,10 +3,15 @@
 import itertools
 
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QCheckBox
+from PySide6.QtCore import QTimer
 
 from GfmTab import GfmTab
+from Tracer import tracer
 from ScanData import ScanData
 
+# option changes within this many ms of each other are rendered once
+RENDER_DEBOUNCE_MS = 50
+
 class OptionsTab(GfmTab):
 
     """
@@ -19,17 +24,21 @@ class OptionsTab(GfmTab):
         scanData : ScanData,
         name : str,
         scanTypes : list,
+        plot_backend : str = "matplotlib",
     ):
-        super().__init__(parent, scanData, name, scanTypes)
+        super().__init__(parent, scanData, name, scanTypes, plot_backend)
 
         self.options_panel = QWidget()
-        self.options_layout = QVBoxLayout(self.options_panel)
+        self.side_layout = QVBoxLayout(self.options_panel)
+        self.options_panel.setLayout(self.side_layout)
+        # the options of the selected scan, a new widget for each scan
+        self.scan_options = None
+        self.options_layout = None
         self.options_checkboxes = {}
-        self.options_panel.setLayout(self.options_layout)
+        self.new_scan_options()
         plot_panel = QWidget()
         plot_layout = QVBoxLayout(plot_panel)
-        plot_layout.addWidget(self.toolbar)
-        plot_layout.addWidget(self.canvas)
+        plot_layout.addWidget(self.plot_widget)
         plot_panel.setLayout(plot_layout)
         layout = QHBoxLayout(self)
         vbox = QVBoxLayout()
@@ -38,6 +47,12 @@ class OptionsTab(GfmTab):
         layout.addWidget(self.options_panel)
         self.setLayout(layout)
 
+        # option changes are coalesced into one render
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(RENDER_DEBOUNCE_MS)
+        self.render_timer.timeout.connect(self.on_option_checkbox_changed)
+
     def display_scan_data(self, currentScanIndex):
         "Called in response to a scan selection change.  Displays the default plot"
         # save which scan index was selected
@@ -47,44 +62,67 @@ class OptionsTab(GfmTab):
         # use the scan data to update the text edit and options panel
         print(f"Displaying scan data for: {scan['scan']}, type: {type(scan)}")
         # value = f"proj: {self.scanData.project}, scan: {scan['scan']}"  # removed text_edit
-        # Clear previous options
-        while self.options_layout.count():
-            item = self.options_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.setParent(None)
-        self.options_checkboxes.clear()
-        # Get scan options and create checkboxes
-        opts = self.scanData.getScanOptions(self.currentScanIndex, self.labels)
-        self.optionKeys = opts.keys()
-        for label, values in opts.items():
-            group_box = QGroupBox(label)
-            v_layout = QVBoxLayout()
-            checkboxes = []
-            for i, val in enumerate(values):
-                cb = QCheckBox(str(val))
-                # first checkbox is checked by default
-                if i == 0:
-                    cb.setChecked(True)
-                v_layout.addWidget(cb)
-                checkboxes.append(cb)
-                cb.stateChanged.connect(self.on_option_checkbox_changed)
-            group_box.setLayout(v_layout)
-            self.options_layout.addWidget(group_box)
-            self.options_checkboxes[label] = checkboxes
-
-        # children can add more options here
-        self.add_additional_options()
+        with tracer.span("build options", tab=self.name):
+            # Clear previous options
+            self.new_scan_options()
+            # Get scan options and create checkboxes
+            opts = self.scanData.getScanOptions(self.currentScanIndex, self.labels)
+            self.optionKeys = opts.keys()
+            for label, values in opts.items():
+                group_box = QGroupBox(label)
+                v_layout = QVBoxLayout()
+                checkboxes = []
+                for i, val in enumerate(values):
+                    cb = QCheckBox(str(val))
+                    # first checkbox is checked by default
+                    if i == 0:
+                        cb.setChecked(True)
+                    v_layout.addWidget(cb)
+                    checkboxes.append(cb)
+                    cb.stateChanged.connect(self.schedule_render)
+                group_box.setLayout(v_layout)
+                self.options_layout.addWidget(group_box)
+                self.options_checkboxes[label] = checkboxes
+
+            # children can add more options here
+            self.add_additional_options()
 
         # Trigger the checkbox change handler to update the plot
         self.on_option_checkbox_changed()
 
+    def new_scan_options(self):
+        "Replace the options widget, deleting the previous one with all its widgets and connections"
+        if self.scan_options is not None:
+            self.scan_options.setParent(None)
+            self.scan_options.deleteLater()
+        self.scan_options = QWidget()
+        self.options_layout = QVBoxLayout(self.scan_options)
+        self.options_layout.setContentsMargins(0, 0, 0, 0)
+        self.side_layout.insertWidget(0, self.scan_options)
+        self.options_checkboxes.clear()
+
     def add_additional_options(self):
         "Override this method in subclasses to add additional options"
         pass
 
+    def schedule_render(self):
+        """
+        Connected to the option widgets' signals.  Rather than replotting for
+        every change, (re)start a short timer so that a burst of changes is
+        rendered once, with whatever the options are when it fires.
+        """
+        self.render_timer.start()
+
     def on_option_checkbox_changed(self):
         "Called when an option checkbox is changed.  Updates the plot based on selected options."
+        self.render_timer.stop()
+        self.render_options()
+
+    def render_options(self):
+        "Plots the combinations of the selected options"
+        if self.currentScanIndex is None:
+            # e.g. a stack option changed before any scan was selected
+            return
         # find the selected values from the checkboxes
         # labels = ["beams", "pols", "phases", "freqs"]
         print(f"self.optionKeys: {self.optionKeys  }")
@@ -109,7 +147,8 @@ class OptionsTab(GfmTab):
             return
         # turn this dict into a list of all combinations of selected values
         value_lists = [selected_values[label] for label in labels]
-        key_combinations = list(itertools.product(*value_lists))
+        with tracer.span("key combinations", tab=self.name):
+            key_combinations = list(itertools.product(*value_lists))
         print(f"key_combinations: {key_combinations}")
         self.plot_data(self.currentScanIndex, key_combinations)
 
@@ -126,6 +165,7 @@ class OptionsTab(GfmTab):
             optionsKeys,
             "Time",
             "Power",
-            self.scanData.getScanShortDesc(scanIndex)
+            self.scanData.getScanShortDesc(scanIndex),
+            cache_key=(scanIndex, tuple(optionsKeys))
         )
 
@@ -0,0 +1,32 @@
+"A module for the PlotBackend class"
+
+class PlotBackend:
+    """
+    The interface of what draws a PlotData in a GFM tab: a widget, and
+    a way to show a PlotData on it.  MatplotlibPlotBackend draws with
+    matplotlib, as everything else in GFM; QtChartsPlotBackend draws
+    with Qt Charts, which is much faster for interactive use.
+    """
+
+    name = None
+
+    def widget(self):
+        "the widget showing the plots"
+        raise NotImplementedError("widget must be implemented by subclasses.")
+
+    def show(self, plotter, cache_key=None):
+        """
+        Shows the PlotData in place of the current plot, drawn on the next
+        event loop pass.  cache_key identifies the plot for backends that
+        cache what they have drawn.
+        Returns the colour of each series, e.g. for the console.
+        """
+        raise NotImplementedError("show must be implemented by subclasses.")
+
+    def set_x_range(self, xmin, xmax):
+        "shows the given range of x, like panning or zooming does"
+        raise NotImplementedError("set_x_range must be implemented by subclasses.")
+
+    def render(self):
+        "draws the plot right away instead of on the next event loop pass, e.g. for benchmarks"
+        raise NotImplementedError("render must be implemented by subclasses.")
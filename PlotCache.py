@@ -0,0 +1,71 @@
+"A module for the PlotCache class"
+
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# memory budget for the cached pixel buffers
+DEFAULT_PLOT_CACHE_BYTES = 64 * 1024 * 1024
+
+class PlotCache:
+    """
+    A least recently used cache of rendered plots: the Agg pixels of a
+    canvas right after a plot was drawn, keyed by what was plotted
+    (scan index, tab, option keys, polarization, integration, view).
+    Revisiting a plot restores the pixels instead of drawing again.
+    Entries are only valid for a canvas of the size they were drawn at.
+    """
+
+    def __init__(self, maxBytes=DEFAULT_PLOT_CACHE_BYTES):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()  # key -> (canvas size, pixels, nbytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, size):
+        "returns what was cached for the key at the given canvas size, or None"
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != size:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, size, pixels):
+        """
+        caches the pixels of a canvas of the given (width, height) in pixels,
+        along with whatever else is needed to show them, e.g. line colours
+        """
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[2]
+        nbytes = 4 * size[0] * size[1]  # RGBA
+        if nbytes > self.maxBytes:
+            return
+        self.entries[key] = (size, pixels, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.maxBytes:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def clear(self):
+        "drops every cached plot, e.g. when a project is (re)loaded"
+        self.entries.clear()
+        self.nbytes = 0
+
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        "returns the cache counters"
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hitRate(),
+            "plots": len(self.entries),
+            "bytes": self.nbytes,
+        }
@@ -2,13 +2,15 @@
 
 from matplotlib.figure import Figure
 
+from LevelOfDetail import LevelOfDetail
+
 class PlotData:
 
     """
     A class to handle detials of how we are plotting our data
     """
 
-    def __init__(self, x, y_list, labels=None, xlabel="", ylabel="", title=""):
+    def __init__(self, x, y_list, labels=None, xlabel="", ylabel="", title="", text_xy=(0.75, 0.75)):
         self.x = x
         self.y_list = y_list  # List of y data arrays
         if labels is not None:
@@ -18,6 +20,7 @@ class PlotData:
         self.xlabel = xlabel
         self.ylabel = ylabel
         self.title = title
+        self.text_xy = text_xy  # where the source label goes, in axes coordinates, or None
 
         print(f"PlotData initialized with {len(y_list)} series, x length: {len(x)}")
         print(f"Labels: {self.labels}")
@@ -31,17 +34,51 @@ class PlotData:
             ax = fig.add_subplot(111)
 
 
+        lines = []
         for y, label in zip(self.y_list, self.labels):
             # print(f"now x is", type(self.x))
             # print(f"Plotting series: {label} with {len(y)} points and {len(self.x)} x points")
-            ax.plot(self.x, y, label=label)
+            lines.extend(ax.plot(self.x, y, label=label))
+        # only draw about as many points as the axes have pixels
+        LevelOfDetail.forAxes(ax).setSeries(lines, self.x, self.y_list)
         ax.set_title(self.title)
         ax.set_xlabel(self.xlabel)
         ax.set_ylabel(self.ylabel)
         ax.legend()
 
-        x = 0.75
-        y = 0.75
-        ax.text(x, y, "source", transform=ax.transAxes,
-                        fontsize=12, color="black", ha="right", va="top")
+        if self.text_xy is not None:
+            x, y = self.text_xy
+            ax.text(x, y, "source", transform=ax.transAxes,
+                            fontsize=12, color="black", ha="right", va="top")
         return fig, ax
+
+    def update(self, ax):
+        """
+        Show this data on axes that may already hold a plot.
+        When the number of series is unchanged the existing lines are
+        updated in place, otherwise the axes are cleared and re-plotted.
+        Returns the lines.
+        """
+        lines = ax.get_lines()
+        numTexts = 0 if self.text_xy is None else 1
+        if len(lines) != len(self.y_list) or len(ax.texts) != numTexts:
+            ax.clear()
+            self.plot(ax=ax)
+            return ax.get_lines()
+
+        labels = [str(label) for label in self.labels]
+        LevelOfDetail.forAxes(ax).setSeries(lines, self.x, self.y_list)
+        if labels != [line.get_label() for line in lines]:
+            for line, label in zip(lines, labels):
+                line.set_label(label)
+            ax.legend()
+        if self.text_xy is not None:
+            ax.texts[0].set_position(self.text_xy)
+        ax.set_title(self.title)
+        ax.set_xlabel(self.xlabel)
+        ax.set_ylabel(self.ylabel)
+        # new data, so forget any zoom and fit the view to it
+        ax.set_autoscale_on(True)
+        ax.relim()
+        ax.autoscale_view()
+        return lines
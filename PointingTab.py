@@ -1,9 +1,12 @@
 "A module for the PointingTab Class, child of ContCalibTab."
 
+from matplotlib.patches import Rectangle
+
 from ContCalibTab import ContCalibTab
-from PlotData import PlotData
 from ScanData import ScanData
-import re
+from ScanPlots import pointingQuadrants
+from ScanPlots import pointingGrid
+from ScanPlots import plotQuadrant
 
 class PointingTab(ContCalibTab):
     """
@@ -11,122 +14,91 @@ class PointingTab(ContCalibTab):
     """
     def __init__(self, parent, scanData: ScanData, name: str, scanTypes: list):
         super().__init__(parent, scanData, name, scanTypes)
-        self.plot_history = []  # Store history of plot figures
-        # You can add more Pointing-specific initialization here if needed
+        # quadrant -> (scan index, polarization) of the scan plotted there
+        self.quadrants = {}
+        # the persistent 2x2 axes, None while a single scan is shown
+        self.grid_axes = None
+        # canvas size the grid was last fully drawn at, None if not drawn
+        self.grid_size = None
+        self.canvas.mpl_connect("draw_event", self.on_grid_drawn)
 
         self.peakScanIndex = None  # Initialize peak scan index
 
-    def display_scan_data(self, currentScanIndex):
-        "For pointing scans, we want to display the scans in a 2x2 grid."
+    def set_scan_data(self, scanData: ScanData):
+        super().set_scan_data(scanData)
+        self.quadrants = {}
+        self.grid_axes = None
+        self.peakScanIndex = None
 
-        scanInfo = self.scanData.getScanDataByIndex(currentScanIndex)
-        desc = scanInfo.get("description", None)
-        desc = desc[5:] # remove "Peak "
-        print(f"Displaying Pointing scan data: {desc}")
-        match = re.search(r'\((\d+) of (\d+)\)', desc if desc else "")
-        if match:
-            n = int(match.group(1))
-            m = int(match.group(2))
-            print(f"Found pattern '(N of M)': N={n}, M={m}")
-            self.peakScanIndex = n - 1
-        else:
-            self.peakScanIndex = None
-
-        # time to start over?
-        if len(self.plot_history) >= 4:
-            # start over
-            self.plot_history = []
+    def display_scan_data(self, currentScanIndex):
+        """
+        For pointing scans, we want to display the scans in a 2x2 grid:
+        selecting any scan of a "(N of M)" sequence shows all of its scans
+        found so far, each in the quadrant of its N.
+        """
+        self.currentScanIndex = currentScanIndex
+        if self.scanData is None:
+            return
 
-        # this could be the first one, or we just did 4 in a row
-        if self.plot_history == []:
+        sequence, self.peakScanIndex = self.scanData.getScanSequence(currentScanIndex)
+        scanIndexes = pointingQuadrants(self.scanData, currentScanIndex)
+        if scanIndexes is None:
+            # not part of a sequence we can show in the grid
+            self.quadrants = {}
+            self.grid_axes = None
             super().display_scan_data(currentScanIndex)
-            # Save the current scan's data to history for future use
-            scanNum = self.scanData.getScanNumByIndex(currentScanIndex)
-            x = self.scanData.getScanXDataByIndex(currentScanIndex)
-            opts = self.scanData.getScanOptions(currentScanIndex, self.labels)
-            pol = self.polarization
-            key = self.get_key_for_pol(pol, opts)
-            y = self.scanData.getScanYDataByIndex(currentScanIndex, key)
-            plot_entry = {
-                "scanNum": scanNum,
-                "x": x,
-                "y": y,
-                "pol": pol,
-                "key": key,
-                # "desc": desc,
-            }
-            self.plot_history.append((self.peakScanIndex, plot_entry))
             return
 
-        # Otherwise we are doing 4 plots in a grid
-        # Always create a 2x2 grid of plots
+        quadrants = {q: (scanIndex, self.polarization) for q, scanIndex in scanIndexes.items()}
+        same = all(quadrants.get(q) == entry for q, entry in self.quadrants.items())
+        changed = [q for q, entry in quadrants.items() if self.quadrants.get(q) != entry]
+        self.quadrants = quadrants
+        if not self.grid_showing() or not same:
+            # a different sequence or polarization
+            self.build_grid()
+        else:
+            # the same sequence, maybe with scans that arrived since
+            for q in changed:
+                self.update_quadrant(q)
+
+    def grid_showing(self):
+        "is the canvas showing our 2x2 grid?"
+        return (self.grid_axes is not None and self.canvas.figure.axes == self.grid_axes
+                and self.matplotlib.stale_plotter is None)
+
+    def build_grid(self):
+        "creates the 2x2 axes and plots every quadrant, with a full redraw"
+        self.grid_axes = pointingGrid(self.use_canvas())
+        self.grid_size = None
+        for q in self.quadrants:
+            self.plot_quadrant(q)
+        self.canvas.draw_idle()
+
+    def plot_quadrant(self, q):
+        "plots the scan of the given quadrant into its axes"
+        scanIndex, pol = self.quadrants[q]
+        plotQuadrant(self.grid_axes[q], self.scanData, scanIndex, pol)
+
+    def update_quadrant(self, q):
+        """
+        Re-plots one quadrant and, when the rest of the grid is already on
+        screen at this size, repaints just that quarter of the canvas.
+        """
+        self.plot_quadrant(q)
+        if self.grid_size != self.canvas_size():
+            self.canvas.draw_idle()
+            return
         fig = self.canvas.figure
-        fig.clear()
-        axes = [fig.add_subplot(2, 2, i+1) for i in range(4)]
-
-
-
-
-        # Plot previous scans from history in their quadrants
-        for idx, plot_data in self.plot_history:
-            if plot_data is None or idx is None or not (0 <= idx < 4):
-                continue
-            try:
-                # Assume plot_data is a tuple (scanNum, x, y, pol, key, desc) or a figure
-                # If it's a figure, skip (we want raw data)
-                if isinstance(plot_data, dict):
-                    print("history plot data found", plot_data)
-                    ax = axes[idx]
-
-                    pol = plot_data['pol']
-                    scanNum = plot_data['scanNum']
-                    title = f"Scan {scanNum} - {pol} Pol"
-                    label = f"{pol}"
-                    p = PlotData(
-                        plot_data["x"],
-                        [plot_data["y"]],
-                        labels=[label],
-                        xlabel="Time",
-                        ylabel="Power",
-                        title=title
-                    )
-                    p.plot(ax=ax)
-            except Exception as e:
-                print(f"Error plotting history scan in quadrant {idx}: {e}")
-
-        # Plot the current scan in the correct quadrant
-        try:
-            scanNum = self.scanData.getScanNumByIndex(currentScanIndex)
-            x = self.scanData.getScanXDataByIndex(currentScanIndex)
-            opts = self.scanData.getScanOptions(currentScanIndex, self.labels)
-            pol = self.polarization
-            key = self.get_key_for_pol(pol, opts)
-            y = self.scanData.getScanYDataByIndex(currentScanIndex, key)
-            idx = self.peakScanIndex if self.peakScanIndex is not None and 0 <= self.peakScanIndex < 4 else 0
-            ax = axes[idx]
-            PlotData(
-                x,
-                [y],
-                labels=[pol],
-                xlabel="Time",
-                ylabel="Power",
-                title=f"Scan {scanNum} - {pol} Pol"
-            ).plot(ax=ax)
-            title = f"Scan {scanNum} - {pol} Pol"
-
-        except Exception as e:
-            print(f"Error plotting current scan in quadrant: {e}")
-
-        self.canvas.draw()
-
-        # Save the current scan's data to history for future use
-        plot_entry = {
-            "scanNum": scanNum,
-            "x": x,
-            "y": y,
-            "pol": pol,
-            "key": key,
-            "desc": desc,
-        }
-        self.plot_history.append((self.peakScanIndex, plot_entry))
-
+        row, col = divmod(q, 2)
+        # blank out the quadrant's quarter of the figure, then draw its axes
+        cell = Rectangle((0.5 * col, 0.5 * (1 - row)), 0.5, 0.5,
+                         transform=fig.transFigure, facecolor=fig.get_facecolor(),
+                         edgecolor="none")
+        cell.set_figure(fig)
+        fig.draw_artist(cell)
+        fig.draw_artist(self.grid_axes[q])
+        self.canvas.blit(cell.get_window_extent())
+
+    def on_grid_drawn(self, event):
+        "remembers the canvas size of the last full draw of the grid"
+        self.grid_size = self.canvas_size() if self.grid_showing() else None
@@ -0,0 +1,74 @@
+"A module for the ProjectLoader class"
+
+import logging
+import threading
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+from ScanData import ScanData
+from ScanStore import LoadCancelled
+from Tracer import tracer
+
+logger = logging.getLogger(__name__)
+
+class ProjectLoader(QObject):
+    """
+    Builds a ScanData off the Qt main thread.  Meant to be moved to a
+    QThread; every signal carries the id of the load so that results
+    from a load that was superseded can be ignored.
+    """
+
+    progress = Signal(int, int, str)  # load id, percent, message
+    loaded = Signal(int, object)  # load id, ScanData
+    failed = Signal(int, str)  # load id, error message
+    cancelled = Signal(int)  # load id
+    finished = Signal()
+
+    def __init__(self, loadId : int, file_name : str, project_name : str, scanDataOptions : dict = None):
+        super().__init__()
+        self.loadId = loadId
+        self.file_name = file_name
+        self.project_name = project_name
+        # keyword arguments for ScanData (dtype, cacheBytes, readAhead)
+        self.scanDataOptions = scanDataOptions or {}
+        self.cancelEvent = threading.Event()
+        self.lastPercent = -1
+
+    def cancel(self):
+        "asks the load to stop at its next progress report; safe to call from any thread"
+        self.cancelEvent.set()
+
+    def report(self, fraction, message):
+        "progress callback handed to ScanData"
+        if self.cancelEvent.is_set():
+            raise LoadCancelled(self.file_name)
+        percent = int(100 * fraction)
+        if percent != self.lastPercent:
+            self.lastPercent = percent
+            self.progress.emit(self.loadId, percent, message)
+
+    @Slot()
+    def run(self):
+        "loads the project, then reports how it went"
+        try:
+            with tracer.span("load project", file=self.file_name, project=self.project_name):
+                scanData = ScanData(
+                    self.file_name,
+                    self.project_name,
+                    progress=self.report,
+                    **self.scanDataOptions
+                )
+        except LoadCancelled:
+            logger.info(f"Loading {self.file_name} cancelled")
+            self.cancelled.emit(self.loadId)
+        except Exception as e:
+            logger.exception(f"Loading {self.file_name} failed")
+            self.failed.emit(self.loadId, str(e))
+        else:
+            if self.cancelEvent.is_set():
+                scanData.close()
+                self.cancelled.emit(self.loadId)
+            else:
+                self.loaded.emit(self.loadId, scanData)
+        finally:
+            self.finished.emit()
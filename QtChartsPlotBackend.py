@@ -0,0 +1,118 @@
+"A module for the QtChartsPlotBackend class"
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.colors import to_rgb
+
+from PySide6.QtCharts import QChart, QLineSeries, QValueAxis
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor, QPen
+
+from PlotBackend import PlotBackend
+from ChartView import ChartView
+from LevelOfDetail import minMaxDecimate
+
+# margin around the data when showing all of it, as a fraction of its range
+DATA_MARGIN = 0.05
+
+class QtChartsPlotBackend(PlotBackend):
+    """
+    Draws PlotData with Qt Charts, natively in Qt, for fast scan stepping
+    and panning.  As with LevelOfDetail, each series is handed to the
+    chart decimated to about two points per pixel of the visible x range,
+    and decimated again whenever the range changes.
+    Series take the colours of matplotlib's colour cycle, so the console
+    colours match either backend.
+    """
+
+    name = "qtcharts"
+
+    def __init__(self, use_opengl=False):
+        self.use_opengl = use_opengl
+        self.chart = QChart()
+        self.chart.setAnimationOptions(QChart.NoAnimation)
+        self.x_axis = QValueAxis()
+        self.y_axis = QValueAxis()
+        self.chart.addAxis(self.x_axis, Qt.AlignBottom)
+        self.chart.addAxis(self.y_axis, Qt.AlignLeft)
+        self.view = ChartView(self.chart)
+        self.series = []  # (QLineSeries, full x, full y, x is increasing)
+        self.colours = [QColor.fromRgbF(*to_rgb(c["color"])) for c in rcParams["axes.prop_cycle"]]
+        self.x_axis.rangeChanged.connect(self.on_x_range_changed)
+        self.chart.plotAreaChanged.connect(lambda area: self.update_series())
+
+    def widget(self):
+        return self.view
+
+    def show(self, plotter, cache_key=None):
+        "Shows the PlotData, reusing the chart's series when their number is unchanged"
+        if len(self.series) != len(plotter.y_list):
+            self.chart.removeAllSeries()
+            self.series = []
+            for i in range(len(plotter.y_list)):
+                series = QLineSeries()
+                series.setUseOpenGL(self.use_opengl)
+                series.setPen(QPen(self.colours[i % len(self.colours)], 1))
+                self.chart.addSeries(series)
+                series.attachAxis(self.x_axis)
+                series.attachAxis(self.y_axis)
+                self.series.append((series, None, None, True))
+
+        x = np.asarray(plotter.x, dtype=np.float64)
+        increasing = bool(len(x) < 2 or np.all(x[1:] >= x[:-1]))
+        for i, (y, label) in enumerate(zip(plotter.y_list, plotter.labels)):
+            series = self.series[i][0]
+            series.setName(str(label))
+            self.series[i] = (series, x, np.asarray(y, dtype=np.float64), increasing)
+
+        self.chart.setTitle(plotter.title)
+        self.x_axis.setTitleText(plotter.xlabel)
+        self.y_axis.setTitleText(plotter.ylabel)
+
+        # new data, so forget any zoom and fit the view to it
+        self.view.full_range = self.data_range()
+        self.view.reset_view()
+        self.update_series()
+        return [self.colours[i % len(self.colours)].name() for i in range(len(self.series))]
+
+    def data_range(self):
+        "(xmin, xmax, ymin, ymax) of all the series, with a margin"
+        xs = [x for _, x, _, _ in self.series if len(x)]
+        ys = [y[np.isfinite(y)] for _, _, y, _ in self.series]
+        ys = [y for y in ys if len(y)]
+        if not xs or not ys:
+            return (0.0, 1.0, 0.0, 1.0)
+        xmin = min(float(x.min()) for x in xs)
+        xmax = max(float(x.max()) for x in xs)
+        ymin = min(float(y.min()) for y in ys)
+        ymax = max(float(y.max()) for y in ys)
+        ymargin = DATA_MARGIN * (ymax - ymin) or 1.0
+        return (xmin, xmax, ymin - ymargin, ymax + ymargin)
+
+    def on_x_range_changed(self, xmin, xmax):
+        self.update_series((xmin, xmax))
+
+    def update_series(self, xlim=None):
+        "shows the given x range (the axis' for None) of every series decimated to the plot width"
+        if xlim is None:
+            xlim = (self.x_axis.min(), self.x_axis.max())
+        width = int(self.chart.plotArea().width())
+        numBins = width if width > 0 else self.view.width()
+        numBins = max(numBins, 1)
+        xmin, xmax = sorted(xlim)
+        for series, x, y, increasing in self.series:
+            if x is None:
+                continue
+            lo, hi = 0, len(y)
+            if increasing and hi > 0:
+                # keep a point past each edge so lines run off the plot
+                lo = max(int(np.searchsorted(x, xmin, side="left")) - 1, 0)
+                hi = min(int(np.searchsorted(x, xmax, side="right")) + 1, len(y))
+            xd, yd = minMaxDecimate(x, y, numBins, lo, hi)
+            series.replaceNp(np.ascontiguousarray(xd), np.ascontiguousarray(yd))
+
+    def set_x_range(self, xmin, xmax):
+        self.x_axis.setRange(xmin, xmax)
+
+    def render(self):
+        self.view.viewport().repaint()
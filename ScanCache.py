@@ -0,0 +1,125 @@
+"A module for the ScanCache class"
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# defaults for the memory budget and how many scans on each side to read ahead
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+DEFAULT_READ_AHEAD = 2
+
+class ScanCache:
+    """
+    A least recently used cache of prepared scans, bounded by a memory
+    budget, that can read scans ahead in a background thread.
+    load is called with a scan index and must return a tuple of the
+    prepared scan and its size in bytes.
+    """
+
+    def __init__(self, load, maxBytes=DEFAULT_CACHE_BYTES, readAhead=DEFAULT_READ_AHEAD):
+        self.load = load
+        self.maxBytes = maxBytes
+        self.readAhead = readAhead
+        self.entries = OrderedDict()  # scan index -> (scan, nbytes), oldest first
+        self.nbytes = 0
+        self.current = None  # scan index last asked for, never evicted
+        self.pending = {}  # scan index -> Future of a read ahead
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ScanCache")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetches = 0
+
+    def get(self, scanIndex):
+        "returns the prepared scan, loading it if it is neither cached nor being read ahead"
+        with self.lock:
+            self.current = scanIndex
+            entry = self.entries.get(scanIndex)
+            if entry is not None:
+                self.entries.move_to_end(scanIndex)
+                self.hits += 1
+                return entry[0]
+            future = self.pending.get(scanIndex)
+        if future is not None:
+            # already on its way, wait for the read ahead instead of loading twice
+            try:
+                scan = future.result()
+            except Exception:
+                pass
+            else:
+                with self.lock:
+                    self.hits += 1
+                return scan
+        scan, nbytes = self.load(scanIndex)
+        with self.lock:
+            self.misses += 1
+            self.put(scanIndex, scan, nbytes)
+        return scan
+
+    def put(self, scanIndex, scan, nbytes):
+        "adds a scan and evicts the least recently used ones over budget; call with the lock held"
+        old = self.entries.pop(scanIndex, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self.entries[scanIndex] = (scan, nbytes)
+        self.nbytes += nbytes
+        # never evict the scan just added or the one being looked at
+        keep = (scanIndex, self.current)
+        for oldest in list(self.entries):
+            if self.nbytes <= self.maxBytes:
+                break
+            if oldest in keep:
+                continue
+            _, evicted = self.entries.pop(oldest)
+            self.nbytes -= evicted
+            self.evictions += 1
+
+    def prefetch(self, scanIndexes):
+        "reads the given scans in the background, nearest first"
+        with self.lock:
+            for scanIndex in scanIndexes:
+                if scanIndex in self.entries or scanIndex in self.pending:
+                    continue
+                self.pending[scanIndex] = self.executor.submit(self.readAheadScan, scanIndex)
+
+    def readAheadScan(self, scanIndex):
+        "runs in the read ahead thread"
+        try:
+            scan, nbytes = self.load(scanIndex)
+        except Exception:
+            logger.exception(f"Reading ahead scan index {scanIndex} failed")
+            with self.lock:
+                self.pending.pop(scanIndex, None)
+            raise
+        with self.lock:
+            self.pending.pop(scanIndex, None)
+            self.prefetches += 1
+            self.put(scanIndex, scan, nbytes)
+        return scan
+
+    def stats(self):
+        "returns the cache counters"
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "prefetches": self.prefetches,
+                "scans": len(self.entries),
+                "bytes": self.nbytes,
+            }
+
+    def clear(self):
+        "drops every cached scan"
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def shutdown(self):
+        "stops reading ahead and drops every cached scan"
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.clear()
@@ -1,22 +1,83 @@
 "A module for the ScanData class"
 
-import pickle
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from ScanStore import openScanStore
+from ScanStore import normalizeScanPayload
+from ScanOptionIndex import ScanOptionIndex
+from ScanCache import ScanCache
+from ScanFilterIndex import ScanFilterIndex
+from ScanSequenceIndex import ScanSequenceIndex
+from IntegrationSums import IntegrationSums
+from Tracer import tracer
+from ScanCache import DEFAULT_CACHE_BYTES
+from ScanCache import DEFAULT_READ_AHEAD
+
+logger = logging.getLogger(__name__)
+
+# memory budget of the running sums kept for averaging integrations
+DEFAULT_SUMS_BYTES = 256 * 1024 * 1024
 
 class ScanData:
-    """class to abstract out the pickle file data"""
-    def __init__(self, pkl_file, project_name):
-        with open(pkl_file, 'rb') as f:
-            self.data = pickle.load(f, encoding='latin1')
+    """class to abstract out the project data on disk"""
+    def __init__(
+        self,
+        pkl_file,
+        project_name,
+        dtype=None,
+        progress=None,
+        cacheBytes=DEFAULT_CACHE_BYTES,
+        readAhead=DEFAULT_READ_AHEAD,
+    ):
         self.project = project_name
-        print(f"data from disk includes projects: {self.data.keys()}")
-        self.numScans = len(self.data[project_name])
+        # every series is normalized to a contiguous float array of this dtype,
+        # None keeps float32 or float64 data as stored
+        self.dtype = dtype
+        # only the scan index is read here, data arrays are loaded on demand
+        with tracer.span("open scan store", file=pkl_file):
+            self.store = openScanStore(pkl_file, project_name, progress)
+        # loaded and prepared scans, bounded by a memory budget
+        self.cache = ScanCache(self.loadScan, cacheBytes, readAhead)
+        self.numScans = self.store.numScans
+        # counted once, when the store was written
+        self.numFixedRecords = self.store.numFixedRecords
         print(f"ScanData: loaded {self.numScans} scans for project {self.project}")
-        print(type(self.data[self.project]))
 
-        self.scanNumToIndex = {}
-        # create a mapping from scan number to index for quick access
-        for i, scanInfo in enumerate(self.data[self.project]):
-            self.scanNumToIndex[scanInfo['scan']] = i
+        with tracer.span("index scans", scans=self.numScans):
+            self.scanNumToIndex = {}
+            # create a mapping from scan number to index for quick access
+            for i, scanInfo in enumerate(self.store.index):
+                self.scanNumToIndex[scanInfo['scan']] = i
+
+            # indexes for filtering the scan list
+            self.filterIndex = ScanFilterIndex()
+            self.filterIndex.addScans(self.store.index)
+            # "(N of M)" pointing and focus sequences
+            self.sequenceIndex = ScanSequenceIndex()
+            self.sequenceIndex.addScans(self.store.index)
+
+        # (scan index, key) -> IntegrationSums, least recently used first
+        self.integrationSums = OrderedDict()
+        self.integrationSumsBytes = 0
+        self.maxSumsBytes = DEFAULT_SUMS_BYTES
+
+    def refresh(self):
+        """
+        picks up scans appended to the data source since it was opened.
+        Returns the number of new scans, which are at the end of the list.
+        """
+        numNew = self.store.poll()
+        for i in range(self.numScans, self.numScans + numNew):
+            self.scanNumToIndex[self.store.getScanMeta(i)['scan']] = i
+        self.filterIndex.addScans(self.store.index[self.numScans:self.numScans + numNew])
+        self.sequenceIndex.addScans(self.store.index[self.numScans:self.numScans + numNew])
+        self.numScans += numNew
+        if numNew:
+            logger.info(f"ScanData: {numNew} new scans for project {self.project}")
+        return numNew
 
     def getScanIndexByScanNum(self, scanNum):
         """returns the index of the scan with the given scan number"""
@@ -25,68 +86,151 @@ class ScanData:
     def getScanNumByIndex(self, index):
         """returns the scan number for the given index"""
         if 0 <= index < self.numScans:
-            return self.data[self.project][index]['scan']
+            return self.store.getScanMeta(index)['scan']
         return None
 
     def getScanDataByIndex(self, index):
-        """returns the scan data for the given index"""
-        scan = self.data[self.project][index]
-        return scan
+        """returns the scan metadata (scan, source, description, scanType ...) for the given index"""
+        return self.store.getScanMeta(index)
+
+    def getScanSequence(self, scanIndex):
+        """
+        returns the "(N of M)" sequence of the given scan, see ScanSequenceIndex,
+        and the scan's position in it, or (None, None)
+        """
+        return self.sequenceIndex.getSequence(scanIndex)
+
+    def getScanSequences(self, scanTypes=None, complete=None):
+        """returns the "(N of M)" sequences of the given scan types, complete, incomplete or both"""
+        return self.sequenceIndex.getSequences(scanTypes, complete)
+
+    def loadScan(self, scanIndex):
+        """
+        loads and prepares a scan for the cache: normalizes its data and
+        builds its option index.  Returns the scan and its size in bytes.
+        """
+        with tracer.span("read scan", index=scanIndex):
+            payload = self.store.loadScanPayload(scanIndex)
+        if self.dtype is not None or not self.store.normalized:
+            # converting to another dtype, or a store written before normalizing
+            with tracer.span("normalize scan", index=scanIndex):
+                payload, _ = normalizeScanPayload(payload, self.dtype)
+        with tracer.span("index options", index=scanIndex):
+            payload["options"] = ScanOptionIndex(payload["ydata"])
+        nbytes = payload["x"].nbytes + sum(y.nbytes for y in payload["ydata"].values())
+        if "exposure" in payload:
+            nbytes += payload["exposure"].nbytes
+        return payload, nbytes
+
+    def getScanPayload(self, scanIndex):
+        """returns the x and ydata of a scan, loading them if they are not cached"""
+        with tracer.span("fetch scan", index=scanIndex):
+            return self.cache.get(scanIndex)
+
+    def prefetch(self, scanIndexes):
+        """reads the given scans into the cache in the background"""
+        self.cache.prefetch(scanIndexes)
+
+    def getScanOptionIndex(self, scanIndex):
+        """returns the option index of a scan, built when the scan is loaded"""
+        return self.getScanPayload(scanIndex)["options"]
 
     def getScanOptions(self, scanIndex, labels):
         """returns the scan options for the given scan index"""
-        # ydata = self.data[self.project][scanIndex]['ydata']
-        d = self.data[self.project][scanIndex]
-        # TBF: bugs in pkl file
-        key = "ydata" if "ydata" in d else "ys"
-        ydata = d[key]
-        keys = list(ydata.keys())
-        options = {}
         # labels = ["beams", "pols", "phases", "freqs"]
-        # extract the unique values for each label
-        for i, label in enumerate(labels):
-            options[label] = set([key[i] for key in keys])
-        # convert sets to sorted lists
-        for k, v in options.items():
-            options[k] = sorted(list(v))
-        return options
+        return self.getScanOptionIndex(scanIndex).getOptions(labels)
+
+    def getScanKeyForOption(self, scanIndex, labels, label, value):
+        """
+        returns the key for the given option value (e.g. pols = 'X'),
+        using the first value of every other option, or None
+        """
+        labels = list(labels)
+        if label not in labels:
+            return None
+        return self.getScanOptionIndex(scanIndex).getKeyForValue(labels.index(label), value)
 
     def getScanXDataByIndex(self, scanIndex):
         """returns the x data for the given scan index"""
-        return self.data[self.project][scanIndex]['x']
+        return self.getScanPayload(scanIndex)['x']
 
     def getScanYDataByIndex(self, scanIndex, key):
         """returns the y data for the given scan index and key"""
-        d = ydata = self.data[self.project][scanIndex]
-        k = "ydata" if "ydata" in d else "ys"
-        ydata = d[k]
-        data = ydata[key]
-        # TBF: bugs in pkl file
-        if len(data) == 2:
-            data = data[0]
-        return data
+        return self.getScanOptionIndex(scanIndex).getData(key)
+
+
+    def getScanNumIntegrations(self, scanIndex):
+        """
+        returns the number of integrations of a scan: spectral data may
+        be 2D, (integrations, channels), otherwise there is just one
+        """
+        ydata = self.getScanOptionIndex(scanIndex).lookup
+        for y in ydata.values():
+            return y.shape[0] if y.ndim == 2 else 1
+        return 0
 
+    def getScanIntegrationData(self, scanIndex, key, integration):
+        """returns the y data of one integration for the given scan index and key"""
+        y = self.getScanYDataByIndex(scanIndex, key)
+        return y[integration] if y.ndim == 2 else y
+
+    def getScanWaterfall(self, scanIndex, key):
+        """returns every integration of the given scan index and key stacked into a 2D array, one row each"""
+        # a view, the data is already stored (integrations, channels)
+        return np.atleast_2d(self.getScanYDataByIndex(scanIndex, key))
+
+    def getScanExposure(self, scanIndex):
+        """returns the exposure of each integration of a scan, or None if not recorded"""
+        return self.getScanPayload(scanIndex).get("exposure")
+
+    def getScanIntegrationSums(self, scanIndex, key):
+        """returns the running sums over the integrations of the given scan index and key"""
+        cacheKey = (scanIndex, key)
+        sums = self.integrationSums.get(cacheKey)
+        if sums is not None:
+            self.integrationSums.move_to_end(cacheKey)
+            return sums
+        sums = IntegrationSums(self.getScanWaterfall(scanIndex, key), self.getScanExposure(scanIndex))
+        self.integrationSums[cacheKey] = sums
+        self.integrationSumsBytes += sums.nbytes
+        # keep the one just made even if it is over budget on its own
+        while self.integrationSumsBytes > self.maxSumsBytes and len(self.integrationSums) > 1:
+            _, evicted = self.integrationSums.popitem(last=False)
+            self.integrationSumsBytes -= evicted.nbytes
+        return sums
+
+    def getScanIntegrationAverage(self, scanIndex, key, first, last, weighted=False):
+        """
+        returns the average of integrations first to last (inclusive) of the
+        given scan index and key, weighted by exposure if asked and recorded
+        """
+        return self.getScanIntegrationSums(scanIndex, key).average(first, last, weighted)
 
     def getScanFullDesc(self, scan_index):
         """returns a full description of the scan"""
-        scan = self.data[self.project][scan_index]
+        scan = self.store.getScanMeta(scan_index)
         src = scan['source'] if 'source' in scan else 'unknown'
         desc = f"{scan['scan']}:{src} {scan['description']}"
         return desc
 
     # def getScanShortDesc(self, scan_index):
     #     """returns a short description of the scan"""
-    #     scan = self.data[self.project][scan_index]
+    #     scan = self.store.getScanMeta(scan_index)
     #     src = scan['source'] if 'source' in scan else 'unknown'
     #     desc = f"{scan['scan']}:{src} {scan['description']}"
     #     return desc
 
     def getScanShortDesc(self, scan_index):
         """returns a short description of the scan"""
-        scan = self.data[self.project][scan_index]
+        scan = self.store.getScanMeta(scan_index)
         src = scan['source'] if 'source' in scan else 'unknown'
         desc = f"{scan['scan']}:{src}"
         return desc
 
+    def close(self):
+        """stops reading ahead and releases the data on disk"""
+        self.cache.shutdown()
+        self.store.close()
+
     def __repr__(self):
         return f"ScanData(project={self.project}, scan={getattr(self, 'scan', None)})"
@@ -0,0 +1,82 @@
+"A module for the ScanFilterIndex class"
+
+import re
+import bisect
+
+# splits descriptions into search tokens
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9+\-.]+")
+# scan:400-600, scan:450, scan:400- and scan:-600
+SCAN_RANGE_PATTERN = re.compile(r"^(\d*)(?:(-)(\d*))?$")
+
+class ScanFilterIndex:
+    """
+    Indexes of scan type, source, scan number and description tokens,
+    built once from the scan metadata, that answer scan list filters
+    without formatting or scanning every scan.
+
+    A query is made of space separated terms, all of which must match:
+        type:Peak  source:3C286  scan:400-600  scan:450  word
+    Bare words match description tokens, case-insensitively.
+    """
+
+    def __init__(self):
+        self.numScans = 0
+        self.byType = {}  # lower case scanType -> set of scan indexes
+        self.bySource = {}  # lower case source -> set of scan indexes
+        self.byToken = {}  # lower case description token -> set of scan indexes
+        self.scanNums = []  # sorted scan numbers
+        self.scanNumIndexes = []  # scan index of each entry of scanNums
+
+    def addScans(self, scanInfos):
+        "indexes the metadata of scans appended after the ones already indexed"
+        for scanInfo in scanInfos:
+            i = self.numScans
+            self.numScans += 1
+            scanType = str(scanInfo.get('scanType', 'unknown')).lower()
+            self.byType.setdefault(scanType, set()).add(i)
+            source = str(scanInfo.get('source', 'unknown')).lower()
+            self.bySource.setdefault(source, set()).add(i)
+            for token in TOKEN_PATTERN.findall(str(scanInfo.get('description', ''))):
+                self.byToken.setdefault(token.lower(), set()).add(i)
+            pos = bisect.bisect_right(self.scanNums, scanInfo['scan'])
+            self.scanNums.insert(pos, scanInfo['scan'])
+            self.scanNumIndexes.insert(pos, i)
+
+    def scanRange(self, first, last):
+        "returns the indexes of scans with numbers from first to last, inclusive"
+        lo = bisect.bisect_left(self.scanNums, first)
+        hi = bisect.bisect_right(self.scanNums, last)
+        return set(self.scanNumIndexes[lo:hi])
+
+    def termMatches(self, term):
+        "returns the set of scan indexes matching one query term"
+        field, sep, value = term.partition(":")
+        if not sep:
+            return self.byToken.get(term.lower(), set())
+        field = field.lower()
+        value = value.lower()
+        if field == "type":
+            return self.byType.get(value, set())
+        if field == "source":
+            return self.bySource.get(value, set())
+        if field == "scan":
+            match = SCAN_RANGE_PATTERN.match(value)
+            if match is None or not (match.group(1) or match.group(3)):
+                return set()
+            first = int(match.group(1)) if match.group(1) else float("-inf")
+            if match.group(2):
+                last = int(match.group(3)) if match.group(3) else float("inf")
+            else:
+                last = first
+            return self.scanRange(first, last)
+        # unknown field, treat the whole term as a word
+        return self.byToken.get(term.lower(), set())
+
+    def query(self, text):
+        "returns the set of scan indexes matching every term, or None for an empty query"
+        terms = text.split()
+        if not terms:
+            return None
+        # start from the smallest set so the intersections stay cheap
+        matches = sorted((self.termMatches(term) for term in terms), key=len)
+        return matches[0].intersection(*matches[1:])
@@ -0,0 +1,35 @@
+"A module for the ScanFilterProxyModel class"
+
+from PySide6.QtCore import QSortFilterProxyModel
+
+from ScanListModel import ScanListModel
+
+class ScanFilterProxyModel(QSortFilterProxyModel):
+    """
+    Filters the scan list with the indexes of ScanData.filterIndex,
+    so a new filter costs set lookups instead of formatting every row.
+    """
+
+    def __init__(self, model : ScanListModel):
+        super().__init__()
+        self.setSourceModel(model)
+        self.query = ""
+        self.accepted = None  # scan indexes passing the filter, None for all
+
+    def setQuery(self, query : str):
+        "Filter the scans with the given query, see ScanFilterIndex"
+        self.query = query
+        model = self.sourceModel()
+        self.accepted = model.scanData.filterIndex.query(query)
+        if self.accepted:
+            # matches may be past the rows fetched so far
+            model.fetchUpTo(max(self.accepted) + 1)
+        self.invalidateRowsFilter()
+
+    def refresh(self):
+        "Re-run the query, e.g. after new scans were added to the source model"
+        if self.accepted is not None:
+            self.setQuery(self.query)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.accepted is None or source_row in self.accepted
@@ -1,17 +1,66 @@
 from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
 from ScanData import ScanData
 
+# number of rows added to the model each time the view asks for more
+FETCH_BATCH = 256
+
 class ScanListModel(QAbstractListModel):
     def __init__(self, scanData : ScanData):
         super().__init__()
         self.scanData = scanData
+        # display strings of the rows fetched so far, formatted once per row
+        self.descriptions = []
+
+    @property
+    def numRows(self):
+        return len(self.descriptions)
 
     def rowCount(self, parent=QModelIndex()):
-        return self.scanData.numScans
+        if parent.isValid():
+            return 0
+        return self.numRows
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.numRows < self.scanData.numScans
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.fetchUpTo(self.numRows + FETCH_BATCH)
+
+    def fetchUpTo(self, numRows):
+        "Make sure at least the first numRows scans (or all of them) are in the model"
+        numRows = min(numRows, self.scanData.numScans)
+        if numRows <= self.numRows:
+            return
+        first = self.numRows
+        self.beginInsertRows(QModelIndex(), first, numRows - 1)
+        self.descriptions.extend(self.scanData.getScanFullDesc(i) for i in range(first, numRows))
+        self.endInsertRows()
+
+    def fetchAll(self):
+        self.fetchUpTo(self.scanData.numScans)
+
+    def invalidate(self, first=0, last=None):
+        "Re-format the cached display strings of the given rows, e.g. after their metadata changed"
+        if last is None:
+            last = self.numRows - 1
+        if last < first:
+            return
+        for i in range(first, last + 1):
+            self.descriptions[i] = self.scanData.getScanFullDesc(i)
+        self.dataChanged.emit(self.index(first, 0), self.index(last, 0), [Qt.DisplayRole])
+
+    def refresh(self):
+        "Pick up scans appended to the data source, returns how many"
+        fullyFetched = self.numRows == self.scanData.numScans
+        numNew = self.scanData.refresh()
+        if numNew and fullyFetched:
+            # the view is already showing the end of the list
+            self.fetchAll()
+        return numNew
 
     def data(self, index, role):
         if role == Qt.DisplayRole and index.isValid():
-            return self.scanData.getScanFullDesc(index.row())
+            return self.descriptions[index.row()]
         return None
 
     def getScanDataByIndex(self, index):
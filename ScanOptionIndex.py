@@ -0,0 +1,51 @@
+"A module for the ScanOptionIndex class"
+
+
+class ScanOptionIndex:
+    """
+    The option values (beams, pols, phases, freqs/IFs) of one scan,
+    built once from the keys of its ydata so that listing options and
+    resolving keys don't have to walk every key again.
+    """
+
+    def __init__(self, ydata):
+        # tuple -> array lookup table for the scan's data
+        self.lookup = ydata
+        keys = list(ydata.keys())
+        numAxes = len(keys[0]) if keys else 0
+        # sorted unique values of each position of the key tuples
+        self.axes = [sorted(set(key[i] for key in keys)) for i in range(numAxes)]
+        # case-insensitive value -> value, per axis
+        self.valueLookup = [{str(v).upper(): v for v in axis} for axis in self.axes]
+        self.options = {}  # labels -> options dict
+        self.keys = {}  # (axis, value) -> key tuple
+
+    def getOptions(self, labels):
+        "returns a dict of label -> sorted option values"
+        labels = tuple(labels)
+        options = self.options.get(labels)
+        if options is None:
+            options = {label: self.axes[i] for i, label in enumerate(labels)}
+            self.options[labels] = options
+        return options
+
+    def getKeyForValue(self, axis, value):
+        """
+        returns the key with the given value (matched case-insensitively)
+        at the given axis and the first value of every other axis,
+        or None if the scan has no such value
+        """
+        cacheKey = (axis, str(value).upper())
+        if cacheKey in self.keys:
+            return self.keys[cacheKey]
+        key = None
+        if axis < len(self.axes):
+            match = self.valueLookup[axis].get(cacheKey[1])
+            if match is not None:
+                key = tuple(match if i == axis else vals[0] for i, vals in enumerate(self.axes))
+        self.keys[cacheKey] = key
+        return key
+
+    def getData(self, key):
+        "returns the data array for the given key tuple"
+        return self.lookup[key]
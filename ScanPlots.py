@@ -0,0 +1,154 @@
+"""
+The plots of the GFM tabs, as functions of the scan data that return a
+PlotData, so they can be drawn by the tabs or without Qt by render_project.
+"""
+
+from PlotData import PlotData
+from ScanData import ScanData
+
+# the options available for continuum and spectral data
+CONTINUUM_LABELS = ["beams", "pols", "phases", "freqs"]
+SPECTRAL_LABELS = ["beams", "pols", "phases", "IFs"]
+
+# the polarization the continuum calibration tabs start with
+DEFAULT_POLARIZATION = "X"
+
+# figure layout of the 2x2 pointing grid, with room for the tick labels,
+# axis labels and titles of each plot inside its own quarter of the figure
+GRID_LAYOUT = dict(left=0.1, right=0.97, bottom=0.1, top=0.93, wspace=0.4, hspace=0.5)
+
+# TBF: we don't have the freq data so fake it
+SPECTRAL_FREQ_RANGE = (1620, 1650)  # MHz
+
+def defaultOptionKeys(scanData : ScanData, scanIndex : int, labels : list):
+    "the option keys plotted when a scan is first shown: the first value of each option"
+    opts = scanData.getScanOptions(scanIndex, labels)
+    return [tuple(values[0] for values in opts.values())]
+
+def continuumPlot(scanData : ScanData, scanIndex : int, optionsKeys : list):
+    "power against time of each of the given option keys"
+    x = scanData.getScanXDataByIndex(scanIndex)
+    y_list = [scanData.getScanYDataByIndex(scanIndex, key) for key in optionsKeys]
+    return PlotData(
+        x,
+        y_list,
+        labels=[str(label) for label in optionsKeys],
+        xlabel="Time",
+        ylabel="Power",
+        title=scanData.getScanShortDesc(scanIndex),
+        text_xy=None
+    )
+
+def channelsToFrequency(x, freqRange=SPECTRAL_FREQ_RANGE):
+    "the frequencies of the channels of a spectrum, whose data is then reversed"
+    # TBF: kluge - we don't have freq. data in pickle file yet
+    # convert x data to frequency using the freqRange
+    # Avoid division by zero if x is all zeros
+    x_max = x.max() if x.size > 0 else 1
+    return freqRange[0] + (freqRange[1] - freqRange[0]) * (x / x_max)
+
+def spectralPlot(scanData : ScanData, scanIndex : int, optionsKeys : list, integration=0,
+                 frequency=False, freqRange=SPECTRAL_FREQ_RANGE, weighted=False):
+    """
+    counts against channels, or frequency, of each of the given option keys
+    for one integration, or the average of a (first, last) range of them,
+    weighted by exposure if asked
+    """
+    x = scanData.getScanXDataByIndex(scanIndex)
+    if isinstance(integration, tuple):
+        first, last = integration
+        y_list = [scanData.getScanIntegrationAverage(scanIndex, key, first, last, weighted)
+                  for key in optionsKeys]
+        integration = f"{first}-{last}"
+    else:
+        y_list = [scanData.getScanIntegrationData(scanIndex, key, integration) for key in optionsKeys]
+    x_label = "Channels"
+
+    # how we plot data depends on the view selected
+    if frequency:
+        x_label = "Frequency (MHz)"
+        x = channelsToFrequency(x, freqRange)
+        y_list = [y[::-1] for y in y_list]
+
+    scanInfo = scanData.getScanDataByIndex(scanIndex)
+    title = f"{scanInfo['project']}:{scanInfo['scan']}:{integration}"
+    # Print 'source' in the upper right hand corner of the plot
+    return PlotData(
+        x,
+        y_list,
+        labels=[str(label) for label in optionsKeys],
+        xlabel=x_label,
+        ylabel="Counts",
+        title=title,
+        text_xy=(0.98, 0.98)
+    )
+
+def polarizationPlot(scanData : ScanData, scanIndex : int, pol=DEFAULT_POLARIZATION,
+                     labels=CONTINUUM_LABELS, text_xy=(0.75, 0.75)):
+    "power against time of one polarization, with the first values of the other options"
+    scanNum = scanData.getScanNumByIndex(scanIndex)
+    x = scanData.getScanXDataByIndex(scanIndex)
+    key = scanData.getScanKeyForOption(scanIndex, labels, "pols", pol)
+    y = scanData.getScanYDataByIndex(scanIndex, key)
+    return PlotData(
+        x,
+        [y],
+        labels=[pol],
+        xlabel="Time",
+        ylabel="Power",
+        title=f"Scan {scanNum} - {pol} Pol",
+        text_xy=text_xy
+    )
+
+def pointingQuadrants(scanData : ScanData, scanIndex : int):
+    """
+    the quadrants of the 2x2 pointing grid of the "(N of M)" sequence of a
+    scan: {quadrant: scan index} of the scans found so far, each in the
+    quadrant of its N, or None if the scan can't be shown in a grid
+    """
+    sequence, pos = scanData.getScanSequence(scanIndex)
+    if sequence is None or not 0 <= pos < 4:
+        return None
+    if sequence["total"] > 4:
+        print(f"Only the first 4 of {sequence['total']} scans fit in the grid")
+    return {q: i for q, i in enumerate(sequence["scans"][:4]) if i is not None}
+
+def pointingGrid(fig):
+    "clears the figure and returns the 4 axes of the pointing grid, by quadrant"
+    fig.clear()
+    gs = fig.add_gridspec(2, 2, **GRID_LAYOUT)
+    return [fig.add_subplot(gs[i // 2, i % 2]) for i in range(4)]
+
+def plotQuadrant(ax, scanData : ScanData, scanIndex : int, pol=DEFAULT_POLARIZATION):
+    "plots one polarization of a scan into its quadrant of the pointing grid"
+    ax.clear()
+    try:
+        polarizationPlot(scanData, scanIndex, pol).plot(ax=ax)
+    except Exception as e:
+        print(f"Error plotting scan index {scanIndex} in the grid: {e}")
+
+def defaultScanPlot(scanData : ScanData, scanIndex : int):
+    "the line plot a scan first gets in the continuum or spectral tab"
+    scanType = scanData.getScanDataByIndex(scanIndex).get('scanType')
+    if scanType == "spectral":
+        return spectralPlot(scanData, scanIndex, defaultOptionKeys(scanData, scanIndex, SPECTRAL_LABELS))
+    return continuumPlot(scanData, scanIndex, defaultOptionKeys(scanData, scanIndex, CONTINUUM_LABELS))
+
+def drawScanPlot(fig, scanData : ScanData, scanIndex : int):
+    """
+    draws the plot a scan first gets in the GUI, in the tab shown for its
+    scan type: the pointing grid of its sequence for Peak scans, one
+    polarization for Focus scans and the default line plot otherwise
+    """
+    scanType = scanData.getScanDataByIndex(scanIndex).get('scanType')
+    if scanType == "Peak":
+        quadrants = pointingQuadrants(scanData, scanIndex)
+        if quadrants is not None:
+            axes = pointingGrid(fig)
+            for q, i in quadrants.items():
+                plotQuadrant(axes[q], scanData, i)
+            return
+    if scanType in ("Peak", "Focus"):
+        polarizationPlot(scanData, scanIndex).plot(ax=fig.add_subplot(111))
+        return
+    defaultScanPlot(scanData, scanIndex).plot(ax=fig.add_subplot(111))
@@ -0,0 +1,75 @@
+"A module for the ScanSequenceIndex class"
+
+import re
+
+# e.g. "Peak (2 of 4)"
+SEQUENCE_PATTERN = re.compile(r'\((\d+) of (\d+)\)')
+
+class ScanSequenceIndex:
+    """
+    Groups scans described as "(N of M)", like the four Peak scans of a
+    pointing or a series of focus scans, into sequences, built once from
+    the scan metadata.
+
+    Each sequence is a dict:
+        scanType, source, total (M), scans: scan index of each N (None if missing)
+    A scan continues the last sequence of the same type, source and M
+    if its N has not been seen there yet, otherwise it starts a new one,
+    so the members do not have to be consecutive in the project.
+    """
+
+    def __init__(self):
+        self.numScans = 0
+        self.sequences = []
+        self.scanSequence = {}  # scan index -> (sequence number, N - 1)
+        self.open = {}  # (scanType, source, M) -> number of its last sequence
+
+    def addScans(self, scanInfos):
+        "indexes the metadata of scans appended after the ones already indexed"
+        for scanInfo in scanInfos:
+            i = self.numScans
+            self.numScans += 1
+            match = SEQUENCE_PATTERN.search(str(scanInfo.get('description', '')))
+            if match is None:
+                continue
+            n = int(match.group(1))
+            m = int(match.group(2))
+            if not 1 <= n <= m:
+                continue
+            scanType = scanInfo.get('scanType', 'unknown')
+            source = scanInfo.get('source', 'unknown')
+            key = (scanType, source, m)
+            seqNum = self.open.get(key)
+            if seqNum is None or self.sequences[seqNum]["scans"][n - 1] is not None:
+                seqNum = len(self.sequences)
+                self.sequences.append({
+                    "scanType": scanType,
+                    "source": source,
+                    "total": m,
+                    "scans": [None] * m,
+                })
+                self.open[key] = seqNum
+            self.sequences[seqNum]["scans"][n - 1] = i
+            self.scanSequence[i] = (seqNum, n - 1)
+
+    def getSequence(self, scanIndex):
+        "returns the sequence the scan belongs to and its position (N - 1) in it, or (None, None)"
+        seqNum, position = self.scanSequence.get(scanIndex, (None, None))
+        if seqNum is None:
+            return None, None
+        return self.sequences[seqNum], position
+
+    @staticmethod
+    def isComplete(sequence):
+        return None not in sequence["scans"]
+
+    def getSequences(self, scanTypes=None, complete=None):
+        """
+        returns the sequences of the given scan types (all for None),
+        only the complete or incomplete ones if complete is True or False
+        """
+        return [
+            s for s in self.sequences
+            if (scanTypes is None or s["scanType"] in scanTypes)
+            and (complete is None or self.isComplete(s) == complete)
+        ]
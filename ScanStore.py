@@ -0,0 +1,466 @@
+"A module for the storage backends behind ScanData"
+
+import os
+import pickle
+import struct
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# file name suffix of the lazily loaded scan log layout
+SCAN_LOG_SUFFIX = ".scans"
+SCAN_LOG_MAGIC = b"GFMSCANS2\n"
+# logs written before payloads were normalized on writing
+SCAN_LOG_MAGIC_RAW = b"GFMSCANS1\n"
+# after the magic: the number of records that needed fixing when written
+SCAN_LOG_HEADER = struct.Struct("<Q")
+# each record is framed by the lengths of its metadata and payload pickles
+RECORD_HEADER = struct.Struct("<QQ")
+
+# suffix, index and data file names of the columnar memory mapped layout
+COLUMNAR_SUFFIX = ".gfm"
+COLUMNAR_INDEX = "index.pkl"
+COLUMNAR_DATA = "data.bin"
+# arrays in the columnar data file start on this byte boundary
+COLUMNAR_ALIGN = 64
+
+# keys of a scan record that hold the (large) data arrays
+PAYLOAD_KEYS = ("x", "ydata", "ys", "exposure")
+
+
+class LoadCancelled(Exception):
+    "raised from a progress callback to abandon loading a project"
+    pass
+
+
+class ProgressFile:
+    """
+    Wraps a binary file and reports the fraction of it read so far to
+    a progress callback, so that pickle.load can show its progress.
+    """
+
+    def __init__(self, f, size, progress, message):
+        self.f = f
+        self.size = max(size, 1)
+        self.progress = progress
+        self.message = message
+        self.step = max(self.size // 100, 1)
+        self.nextReport = 0
+
+    def report(self):
+        pos = self.f.tell()
+        if pos >= self.nextReport:
+            self.nextReport = pos + self.step
+            self.progress(pos / self.size, self.message)
+
+    def read(self, n=-1):
+        data = self.f.read(n)
+        self.report()
+        return data
+
+    def readinto(self, b):
+        n = self.f.readinto(b)
+        self.report()
+        return n
+
+    def readline(self):
+        line = self.f.readline()
+        self.report()
+        return line
+
+
+def splitScanRecord(record):
+    "splits a raw scan record into its small metadata and its data payload"
+    meta = {k: v for k, v in record.items() if k not in PAYLOAD_KEYS}
+    payload = {k: v for k, v in record.items() if k in PAYLOAD_KEYS}
+    return meta, payload
+
+
+def normalizeScanPayload(payload, dtype=None):
+    """
+    Puts a data payload into the canonical schema: x as a contiguous
+    float64 array, ydata as a dict of contiguous float arrays of the
+    given dtype (None keeps float32/float64 data as stored and turns
+    anything else into float64) and the exposure of each integration,
+    if any, as float64.  Fixes the quirks of the legacy dumps on the way
+    ("ys" instead of "ydata", (data, extra) pairs instead of data,
+    python lists).
+    Returns the normalized payload and whether anything needed fixing.
+    """
+    fixed = False
+
+    def toArray(values, arrayDtype):
+        nonlocal fixed
+        if arrayDtype is None:
+            stored = getattr(values, "dtype", None)
+            arrayDtype = stored if stored in (np.float32, np.float64) else np.float64
+        if isinstance(values, np.ndarray) and values.dtype == arrayDtype and values.flags.c_contiguous:
+            return values
+        fixed = True
+        return np.ascontiguousarray(values, dtype=arrayDtype)
+
+    if "ydata" in payload:
+        ydata = payload["ydata"]
+    else:
+        # TBF: bugs in pkl file
+        ydata = payload["ys"]
+        fixed = True
+    normalized = {}
+    for key, values in ydata.items():
+        # TBF: bugs in pkl file, some series were dumped as (data, extra)
+        if isinstance(values, (tuple, list)) and len(values) == 2 and np.ndim(values[0]) > 0:
+            values = values[0]
+            fixed = True
+        normalized[key] = toArray(values, dtype)
+    normalizedPayload = {"x": toArray(payload["x"], np.float64), "ydata": normalized}
+    # optional exposure of each integration of 2D spectral data
+    if payload.get("exposure") is not None:
+        normalizedPayload["exposure"] = toArray(payload["exposure"], np.float64)
+    return normalizedPayload, fixed
+
+
+def loadLegacyPickle(pkl_file, progress=None):
+    """
+    unpickles a whole legacy project dump, as written by production GFM.
+    progress, if given, is called with (fraction, message) as it is read.
+    """
+    with open(pkl_file, 'rb') as f:
+        if progress is not None:
+            size = os.path.getsize(pkl_file)
+            f = ProgressFile(f, size, progress, f"Reading {os.path.basename(pkl_file)}")
+        return pickle.load(f, encoding='latin1')
+
+
+class ScanStore:
+    """
+    Base class for the on disk layouts ScanData can read.
+    A store keeps a small index of scan metadata in memory and
+    hands out the data payload of a scan only when asked for it.
+    """
+
+    # whether a writer may append scans to the store, see poll
+    canFollow = False
+    # whether payloads are stored in the canonical schema, see normalizeScanPayload
+    normalized = False
+    # records that needed fixing when they were normalized
+    numFixedRecords = 0
+
+    def __init__(self, project):
+        self.project = project
+        self.index = []  # list of metadata dicts, one per scan
+
+    @property
+    def numScans(self):
+        return len(self.index)
+
+    def getScanMeta(self, scanIndex):
+        "returns the metadata (scan, source, description, scanType...) of a scan"
+        return self.index[scanIndex]
+
+    def loadScanPayload(self, scanIndex):
+        "returns a dict holding the x and ydata/ys of a scan"
+        raise NotImplementedError("loadScanPayload must be implemented by subclasses.")
+
+    def poll(self):
+        "reads the index of scans added since the store was opened; returns how many there were"
+        return 0
+
+    def close(self):
+        "release any file handles held by the store"
+        pass
+
+
+class PickleScanStore(ScanStore):
+    """
+    Keeps a legacy pickle dump in memory, normalized once.  Only used
+    when a scan log could not be written next to the pickle file.
+    """
+
+    normalized = True
+
+    def __init__(self, project, records):
+        super().__init__(project)
+        self.payloads = []
+        for record in records:
+            meta, payload = splitScanRecord(record)
+            payload, fixed = normalizeScanPayload(payload)
+            self.numFixedRecords += fixed
+            self.index.append(meta)
+            self.payloads.append(payload)
+
+    def loadScanPayload(self, scanIndex):
+        return self.payloads[scanIndex]
+
+
+class ScanLogStore(ScanStore):
+    """
+    Reads a scan log: a header followed by one record per scan, each
+    holding a metadata pickle and a payload pickle.  Opening the file
+    only reads the metadata; payloads are unpickled on demand.
+    Payloads are written normalized, except in logs of the older format.
+    """
+
+    canFollow = True
+
+    def __init__(self, path, project=None, progress=None):
+        super().__init__(project)
+        self.path = path
+        self.offsets = []  # (payload offset, payload length) per scan
+        # payloads may be read from the read ahead thread as well
+        self.lock = threading.Lock()
+        self.file = open(path, 'rb')
+        magic = self.file.read(len(SCAN_LOG_MAGIC))
+        if magic == SCAN_LOG_MAGIC:
+            self.normalized = True
+            header = self.file.read(SCAN_LOG_HEADER.size)
+            if len(header) < SCAN_LOG_HEADER.size:
+                self.file.close()
+                raise ValueError(f"{path} is a truncated GFM scan log")
+            self.numFixedRecords, = SCAN_LOG_HEADER.unpack(header)
+        elif magic != SCAN_LOG_MAGIC_RAW:
+            self.file.close()
+            raise ValueError(f"{path} is not a GFM scan log")
+        self.indexEnd = self.file.tell()  # end of the last complete record
+        try:
+            self.readIndex(progress)
+        except LoadCancelled:
+            self.file.close()
+            raise
+        if self.index:
+            stored = self.index[0].get('project')
+            if self.project is None:
+                self.project = stored
+            elif stored is not None and stored != self.project:
+                self.file.close()
+                raise ValueError(f"{path} holds project {stored}, not {self.project}")
+
+    def readIndex(self, progress=None):
+        """
+        reads the metadata of every complete record after the ones already
+        indexed, skipping over the payloads.  Returns how many were read.
+        """
+        f = self.file
+        with self.lock:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            f.seek(self.indexEnd)
+            numRead = 0
+            while f.tell() + RECORD_HEADER.size <= end:
+                start = f.tell()
+                if progress is not None and numRead % 100 == 0:
+                    progress(start / end, f"Indexing {os.path.basename(self.path)}")
+                meta_len, payload_len = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                if start + RECORD_HEADER.size + meta_len + payload_len > end:
+                    # a writer is still busy with this record
+                    break
+                meta = pickle.loads(f.read(meta_len))
+                self.index.append(meta)
+                self.offsets.append((f.tell(), payload_len))
+                f.seek(payload_len, os.SEEK_CUR)
+                self.indexEnd = f.tell()
+                numRead += 1
+        return numRead
+
+    def poll(self):
+        if os.fstat(self.file.fileno()).st_size <= self.indexEnd:
+            return 0
+        return self.readIndex()
+
+    def loadScanPayload(self, scanIndex):
+        offset, length = self.offsets[scanIndex]
+        with self.lock:
+            self.file.seek(offset)
+            data = self.file.read(length)
+        return pickle.loads(data)
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarScanStore(ScanStore):
+    """
+    Reads the columnar layout written by convert_project.py: a directory
+    holding one contiguous array per x and per ydata key in data.bin,
+    and a small pickled index of scan metadata and array locations.
+    The data file is memory mapped, so payloads are zero-copy views
+    that share the page cache between processes.
+    """
+
+    normalized = True
+
+    def __init__(self, path, project=None):
+        super().__init__(project)
+        self.path = path
+        with open(os.path.join(path, COLUMNAR_INDEX), 'rb') as f:
+            index = pickle.load(f)
+        self.index = index["scans"]
+        self.layouts = index["layouts"]  # per scan array locations
+        self.numFixedRecords = index.get("numFixed", 0)
+        stored = index.get("project")
+        if self.project is None:
+            self.project = stored
+        elif stored is not None and stored != self.project:
+            raise ValueError(f"{path} holds project {stored}, not {self.project}")
+        data_file = os.path.join(path, COLUMNAR_DATA)
+        if os.path.getsize(data_file) > 0:
+            self.buffer = np.memmap(data_file, dtype=np.uint8, mode='r')
+        else:
+            self.buffer = np.zeros(0, dtype=np.uint8)
+
+    def getArray(self, location):
+        "returns a read only view of the array at the given (offset, dtype, shape)"
+        offset, dtype, shape = location
+        dtype = np.dtype(dtype)
+        nbytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        return self.buffer[offset:offset + nbytes].view(dtype).reshape(shape)
+
+    def loadScanPayload(self, scanIndex):
+        layout = self.layouts[scanIndex]
+        payload = {
+            "x": self.getArray(layout["x"]),
+            "ydata": {key: self.getArray(loc) for key, loc in layout["ydata"].items()},
+        }
+        if "exposure" in layout:
+            payload["exposure"] = self.getArray(layout["exposure"])
+        return payload
+
+    def close(self):
+        # the memmap is released once the last view of it goes away
+        self.buffer = None
+
+
+def writeColumnarStore(path, records, project=None, dtype=np.float64):
+    """
+    Writes raw scan records to the columnar layout at the given directory,
+    normalizing their data to the given dtype.
+    Returns the number of arrays written and the number of records that
+    needed fixing.
+    """
+    os.makedirs(path, exist_ok=True)
+    scans = []
+    layouts = []
+    numArrays = 0
+    numFixed = 0
+    with open(os.path.join(path, COLUMNAR_DATA), 'wb') as f:
+
+        def writeArray(array):
+            pad = -f.tell() % COLUMNAR_ALIGN
+            f.write(b"\0" * pad)
+            offset = f.tell()
+            f.write(array.tobytes())
+            return (offset, array.dtype.str, array.shape)
+
+        for record in records:
+            meta, payload = splitScanRecord(record)
+            payload, fixed = normalizeScanPayload(payload, dtype)
+            numFixed += fixed
+            layout = {"x": writeArray(payload["x"]), "ydata": {}}
+            for key, values in payload["ydata"].items():
+                layout["ydata"][key] = writeArray(values)
+            numArrays += 1 + len(payload["ydata"])
+            if "exposure" in payload:
+                layout["exposure"] = writeArray(payload["exposure"])
+                numArrays += 1
+            scans.append(meta)
+            layouts.append(layout)
+
+    index = {"project": project, "scans": scans, "layouts": layouts, "numFixed": numFixed}
+    with open(os.path.join(path, COLUMNAR_INDEX), 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return numArrays, numFixed
+
+
+def appendScanRecord(f, record):
+    """
+    normalizes one raw scan record and appends it to an open scan log file.
+    Returns whether the record needed fixing.
+    """
+    meta, payload = splitScanRecord(record)
+    payload, fixed = normalizeScanPayload(payload)
+    meta_bytes = pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL)
+    payload_bytes = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    f.write(RECORD_HEADER.pack(len(meta_bytes), len(payload_bytes)))
+    f.write(meta_bytes)
+    f.write(payload_bytes)
+    return fixed
+
+
+def writeScanLogHeader(f, numFixed=0):
+    "writes the header of a new scan log, with the number of records that needed fixing"
+    f.write(SCAN_LOG_MAGIC)
+    f.write(SCAN_LOG_HEADER.pack(numFixed))
+
+
+def writeScanLog(path, records):
+    """
+    writes the given raw scan records, normalized, to a new scan log.
+    Returns the number of records that needed fixing.
+    """
+    tmp = path + ".tmp"
+    numFixed = 0
+    with open(tmp, 'wb') as f:
+        writeScanLogHeader(f)
+        for record in records:
+            numFixed += appendScanRecord(f, record)
+        # now that the count is known
+        f.seek(0)
+        writeScanLogHeader(f, numFixed)
+    os.replace(tmp, path)
+    return numFixed
+
+
+def scanLogPathFor(pkl_file, project):
+    "returns where the scan log cached next to a legacy pickle file lives"
+    return f"{pkl_file}.{project}{SCAN_LOG_SUFFIX}"
+
+
+def cachedScanLog(log_path, project, progress=None):
+    "opens the scan log cached next to a legacy pickle, which no writer appends to"
+    store = ScanLogStore(log_path, project, progress)
+    store.canFollow = False
+    return store
+
+
+def openScanStore(path, project, progress=None):
+    """
+    Opens the store for the given file.  Columnar directories (or their
+    index.pkl) and scan logs are opened directly.
+    Legacy pickle files are unpickled once and cached as a scan log next
+    to the pickle, so later opens only read the scan index.
+    progress, if given, is called with (fraction, message) along the way
+    and may raise LoadCancelled to stop.
+    """
+    if os.path.basename(path) == COLUMNAR_INDEX:
+        path = os.path.dirname(path)
+    if os.path.isdir(path):
+        return ColumnarScanStore(path, project)
+    if path.endswith(SCAN_LOG_SUFFIX):
+        return ScanLogStore(path, project, progress)
+
+    log_path = scanLogPathFor(path, project)
+    if os.path.exists(log_path) and os.path.getmtime(log_path) >= os.path.getmtime(path):
+        store = cachedScanLog(log_path, project, progress)
+        if store.normalized:
+            logger.info(f"Using cached scan log {log_path}")
+            return store
+        # written before payloads were normalized, write it again
+        store.close()
+
+    data = loadLegacyPickle(path, progress)
+    print(f"data from disk includes projects: {data.keys()}")
+    if project not in data:
+        raise ValueError(f"project {project} not in {path}, found: {list(data.keys())}")
+    records = data[project]
+    del data  # drop every other project in the dump
+    if progress is not None:
+        progress(1.0, f"Writing scan log {os.path.basename(log_path)}")
+    try:
+        writeScanLog(log_path, records)
+    except OSError as e:
+        logger.warning(f"Could not write scan log {log_path}, keeping pickle in memory: {e}")
+        return PickleScanStore(project, records)
+    logger.info(f"Wrote scan log {log_path}")
+    return cachedScanLog(log_path, project, progress)
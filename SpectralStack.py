@@ -0,0 +1,116 @@
+"""
+Stacking (averaging) the spectra of many scans, aligned on frequency.
+All functions work on 2D arrays, one spectrum per row, so a stack of
+hundreds of scans is a handful of numpy operations.
+"""
+
+import numpy as np
+
+from ScanPlots import SPECTRAL_FREQ_RANGE
+from ScanPlots import channelsToFrequency
+
+def alignSpectra(freqs, spectra, grid=None):
+    """
+    Puts spectra with their own frequency axes on a common one: the given
+    grid, or else the frequencies of the first spectrum.  Spectra already
+    on the grid are used as they are, others are linearly interpolated,
+    with NaN where they don't cover the grid.
+    Returns the grid and the aligned spectra as a 2D array.
+    """
+    if grid is None:
+        grid = np.asarray(freqs[0])
+    aligned = np.empty((len(spectra), len(grid)), dtype=np.float64)
+    for row, (freq, spectrum) in enumerate(zip(freqs, spectra)):
+        freq = np.asarray(freq)
+        if freq is grid or (freq.shape == grid.shape and np.array_equal(freq, grid)):
+            aligned[row] = spectrum
+            continue
+        if freq[0] > freq[-1]:
+            # np.interp needs increasing frequencies
+            freq, spectrum = freq[::-1], spectrum[::-1]
+        aligned[row] = np.interp(grid, freq, spectrum, left=np.nan, right=np.nan)
+    return grid, aligned
+
+def noiseWeights(spectra):
+    """
+    Inverse variance weights of each spectrum, from the scatter between
+    neighbouring channels so that lines and baselines barely count.
+    """
+    noise = np.nanstd(np.diff(spectra, axis=1), axis=1) / np.sqrt(2)
+    with np.errstate(divide="ignore"):
+        weights = 1.0 / noise**2
+    weights[~np.isfinite(weights)] = 0
+    return weights
+
+def stackSpectra(spectra, weights=None, sigma=None, iterations=3):
+    """
+    Weighted average of the rows of spectra, channel by channel, ignoring
+    NaNs.  With sigma, values further than sigma standard deviations from
+    the average of their channel are clipped and the average taken again,
+    up to the given number of iterations.
+    Returns the average and the number of spectra used in each channel.
+    """
+    spectra = np.asarray(spectra, dtype=np.float64)
+    if weights is None:
+        weights = np.ones(len(spectra))
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64)[:, np.newaxis], spectra.shape)
+    mask = np.isfinite(spectra) & (weights > 0)
+    values = np.where(mask, spectra, 0.0)
+    for _ in range(iterations if sigma is not None else 0):
+        average = weightedAverage(values, weights, mask)
+        deviations = np.where(mask, values - average, 0.0)
+        counts = mask.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt((deviations**2).sum(axis=0) / (counts - 1))
+        clipped = mask & ~(np.abs(deviations) <= sigma * std)
+        # channels without enough spectra for a deviation are left alone
+        clipped &= counts > 2
+        if not clipped.any():
+            break
+        mask &= ~clipped
+    return weightedAverage(values, weights, mask), mask.sum(axis=0)
+
+def weightedAverage(values, weights, mask):
+    "the weighted average of each column of values, of the entries in the mask only"
+    used = np.where(mask, weights, 0.0)
+    total = used.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (used * values).sum(axis=0) / total, np.nan)
+
+def scanSpectrum(scanData, scanIndex, key, integration=0):
+    """
+    the spectrum of one scan and key: one integration, or the average of a
+    (first, last) range of them, clamped to the integrations the scan has
+    """
+    last = scanData.getScanNumIntegrations(scanIndex) - 1
+    if isinstance(integration, tuple):
+        first, end = integration
+        return scanData.getScanIntegrationAverage(scanIndex, key, min(first, last), min(end, last))
+    return scanData.getScanIntegrationData(scanIndex, key, min(integration, last))
+
+def stackScans(scanData, scanIndexes, key, integration=0, freqRange=SPECTRAL_FREQ_RANGE,
+               weighted=True, sigma=None, grid=None):
+    """
+    Stacks the spectra of the given key of the given scans (those that
+    have the key) on a common frequency axis, the given grid or else
+    that of the first scan, see stackSpectra.
+    Returns the frequencies, the average, the number of spectra in each
+    channel and the scan indexes used.
+    """
+    freqs = []
+    spectra = []
+    used = []
+    for scanIndex in scanIndexes:
+        if key not in scanData.getScanOptionIndex(scanIndex).lookup:
+            continue
+        x = scanData.getScanXDataByIndex(scanIndex)
+        # as in the frequency view, see ScanPlots.spectralPlot
+        freqs.append(channelsToFrequency(x, freqRange))
+        spectra.append(scanSpectrum(scanData, scanIndex, key, integration)[::-1])
+        used.append(scanIndex)
+    if not used:
+        return None, None, None, used
+    grid, aligned = alignSpectra(freqs, spectra, grid)
+    weights = noiseWeights(aligned) if weighted else None
+    average, counts = stackSpectra(aligned, weights, sigma)
+    return grid, average, counts, used
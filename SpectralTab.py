@@ -1,12 +1,31 @@
 "A module for the ContinuumTab Class"
 
+import time
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.colors import Normalize, LogNorm
+
 from PySide6.QtWidgets import QHBoxLayout
-from PySide6.QtWidgets import QSpinBox, QLabel
+from PySide6.QtWidgets import QSpinBox, QLabel, QCheckBox, QComboBox
 from PySide6.QtWidgets import QRadioButton, QButtonGroup
-import numpy as np
+from PySide6.QtWidgets import QSlider, QPushButton, QDoubleSpinBox, QFileDialog
+from PySide6.QtCore import Qt
 
 from ScanData import ScanData
 from OptionsTab import OptionsTab
+from ScanPlots import SPECTRAL_LABELS
+from ScanPlots import SPECTRAL_FREQ_RANGE
+from ScanPlots import spectralPlot
+from ScanPlots import channelsToFrequency
+from LevelOfDetail import blockAverage
+from PlotData import PlotData
+from SpectralStack import stackScans
+
+# number of downsampled waterfall images kept, see plot_waterfall
+WATERFALL_CACHE_SIZE = 16
+# colour scales of the waterfall
+COLOUR_SCALES = ["Linear", "Log", "Clipped 1-99%"]
 
 class SpectralTab(OptionsTab):
 
@@ -20,22 +39,59 @@ class SpectralTab(OptionsTab):
         scanData : ScanData,
         name : str,
         scanTypes : list,
+        plot_backend : str = "matplotlib",
     ):
-        super().__init__(parent, scanData, name, scanTypes)
+        super().__init__(parent, scanData, name, scanTypes, plot_backend)
 
         # these are the options available for spectral data
-        self.labels = ["beams", "pols", "phases", "IFs"]
+        self.labels = list(SPECTRAL_LABELS)
 
-        # TBF: our data doesn't have multiple integrations, faking it
-        self.numIntegrations = 3
+        # the integrations of the selected scan, rows of its 2D data
+        self.numIntegrations = 1
         self.integration = 0
+        # or the average from integration to last_integration
+        self.average = False
+        self.last_integration = 0
+        self.weighted = False
+
+        # show every integration of a key as one image
+        self.waterfall = False
+        self.colour_scale = COLOUR_SCALES[0]
+        # (scan index, key, image size) -> block averaged waterfall
+        self.waterfall_cache = OrderedDict()
+
+        # stacking the spectra of the scans selected in the list
+        self.stack_scan_indexes = None  # while the stack is showing
+        self.stack_weighted = True
+        self.stack_clip = False
+        self.stack_sigma = 3.0
+        self.stack = None  # the last stack: frequencies, {key: (average, counts)}, scan indexes
 
         # TBF: we also don't have the freq data so fake this as well
         self.xUnits = "Channels"
-        self.xFreqRange = (1620, 1650)  # MHz
+        self.xFreqRange = SPECTRAL_FREQ_RANGE  # MHz
+
+        # kept across scans, unlike the options of each scan
+        self.add_stack_options()
+
+
+    def set_scan_data(self, scanData : ScanData):
+        super().set_scan_data(scanData)
+        self.waterfall_cache.clear()
+        self.stack_scan_indexes = None
+        self.stack = None
+        self.export_stack_button.setEnabled(False)
 
+    def display_scan_data(self, currentScanIndex):
+        # a newly selected scan is shown on its own
+        self.stack_scan_indexes = None
+        super().display_scan_data(currentScanIndex)
 
     def add_additional_options(self):
+        self.numIntegrations = self.scanData.getScanNumIntegrations(self.currentScanIndex)
+        self.integration = min(self.integration, self.numIntegrations - 1)
+        self.last_integration = min(self.last_integration, self.numIntegrations - 1)
+
         # Add a widget for selecting integration
         integration_layout = QHBoxLayout()
         integration_label = QLabel("integration")
@@ -45,11 +101,43 @@ class SpectralTab(OptionsTab):
         self.integration_spinbox.setValue(self.integration)
         self.integration_spinbox.setSingleStep(1)
         self.integration_spinbox.valueChanged.connect(lambda val: setattr(self, "integration", val))
-        self.integration_spinbox.valueChanged.connect(self.on_option_checkbox_changed)
+        self.integration_spinbox.valueChanged.connect(self.schedule_render)
         integration_layout.addWidget(integration_label)
         integration_layout.addWidget(self.integration_spinbox)
         self.options_layout.addLayout(integration_layout)
 
+        # Add widgets for averaging from that integration to another
+        average_layout = QHBoxLayout()
+        self.average_checkbox = QCheckBox("average to")
+        self.average_checkbox.setChecked(self.average)
+        self.average_checkbox.toggled.connect(lambda val: setattr(self, "average", val))
+        self.average_checkbox.toggled.connect(self.schedule_render)
+        self.last_integration_spinbox = QSpinBox()
+        self.last_integration_spinbox.setMinimum(0)
+        self.last_integration_spinbox.setMaximum(self.numIntegrations - 1)
+        self.last_integration_spinbox.setValue(self.last_integration)
+        self.last_integration_spinbox.valueChanged.connect(lambda val: setattr(self, "last_integration", val))
+        self.last_integration_spinbox.valueChanged.connect(self.schedule_render)
+        average_layout.addWidget(self.average_checkbox)
+        average_layout.addWidget(self.last_integration_spinbox)
+        self.options_layout.addLayout(average_layout)
+
+        # sliders to drag either end of the range
+        for spinbox in (self.integration_spinbox, self.last_integration_spinbox):
+            slider = QSlider(Qt.Horizontal)
+            slider.setRange(spinbox.minimum(), spinbox.maximum())
+            slider.setValue(spinbox.value())
+            slider.valueChanged.connect(spinbox.setValue)
+            spinbox.valueChanged.connect(slider.setValue)
+            self.options_layout.addWidget(slider)
+
+        self.weighted_checkbox = QCheckBox("weight by exposure")
+        self.weighted_checkbox.setChecked(self.weighted)
+        self.weighted_checkbox.setEnabled(self.scanData.getScanExposure(self.currentScanIndex) is not None)
+        self.weighted_checkbox.toggled.connect(lambda val: setattr(self, "weighted", val))
+        self.weighted_checkbox.toggled.connect(self.schedule_render)
+        self.options_layout.addWidget(self.weighted_checkbox)
+
         # Add radio buttons for "Channels" and "Frequency" view
         view_layout = QHBoxLayout()
         view_label = QLabel("View")
@@ -59,71 +147,222 @@ class SpectralTab(OptionsTab):
         self.frequency_radio = QRadioButton("Frequency")
         self.channels_radio.setChecked(True)
 
-        self.view_button_group = QButtonGroup(self.options_panel)
+        self.view_button_group = QButtonGroup(self.scan_options)
         self.view_button_group.addButton(self.channels_radio)
         self.view_button_group.addButton(self.frequency_radio)
-        self.view_button_group.buttonClicked.connect(self.on_option_checkbox_changed)
+        self.view_button_group.buttonClicked.connect(self.schedule_render)
 
         view_layout.addWidget(self.channels_radio)
         view_layout.addWidget(self.frequency_radio)
 
         self.options_layout.addLayout(view_layout)
 
+        # Add the waterfall of all integrations and its colour scale
+        waterfall_layout = QHBoxLayout()
+        self.waterfall_checkbox = QCheckBox("Waterfall")
+        self.waterfall_checkbox.setChecked(self.waterfall)
+        self.waterfall_checkbox.toggled.connect(lambda val: setattr(self, "waterfall", val))
+        self.waterfall_checkbox.toggled.connect(self.schedule_render)
+        # one integration or all of them
+        self.integration_spinbox.setEnabled(not self.waterfall)
+        self.waterfall_checkbox.toggled.connect(lambda val: self.integration_spinbox.setEnabled(not val))
+        self.colour_scale_combo = QComboBox()
+        self.colour_scale_combo.addItems(COLOUR_SCALES)
+        self.colour_scale_combo.setCurrentText(self.colour_scale)
+        self.colour_scale_combo.currentTextChanged.connect(lambda val: setattr(self, "colour_scale", val))
+        self.colour_scale_combo.currentTextChanged.connect(self.schedule_render)
+        waterfall_layout.addWidget(self.waterfall_checkbox)
+        waterfall_layout.addWidget(self.colour_scale_combo)
+        self.options_layout.addLayout(waterfall_layout)
+
+    def add_stack_options(self):
+        "Adds the stacking of the selected scans, and its export, below the options of each scan"
+        stack_layout = QHBoxLayout()
+        self.stack_button = QPushButton("Stack selected")
+        self.stack_button.clicked.connect(self.stack_selected_scans)
+        self.export_stack_button = QPushButton("Export stack")
+        self.export_stack_button.setEnabled(False)
+        self.export_stack_button.clicked.connect(self.export_stack)
+        stack_layout.addWidget(self.stack_button)
+        stack_layout.addWidget(self.export_stack_button)
+        self.side_layout.addLayout(stack_layout)
+
+        clip_layout = QHBoxLayout()
+        self.stack_weighted_checkbox = QCheckBox("noise weighted")
+        self.stack_weighted_checkbox.setChecked(self.stack_weighted)
+        self.stack_weighted_checkbox.toggled.connect(lambda val: setattr(self, "stack_weighted", val))
+        self.stack_weighted_checkbox.toggled.connect(self.schedule_render)
+        self.stack_clip_checkbox = QCheckBox("clip at sigma")
+        self.stack_clip_checkbox.setChecked(self.stack_clip)
+        self.stack_clip_checkbox.toggled.connect(lambda val: setattr(self, "stack_clip", val))
+        self.stack_clip_checkbox.toggled.connect(self.schedule_render)
+        self.stack_sigma_spinbox = QDoubleSpinBox()
+        self.stack_sigma_spinbox.setRange(1.0, 10.0)
+        self.stack_sigma_spinbox.setSingleStep(0.5)
+        self.stack_sigma_spinbox.setValue(self.stack_sigma)
+        self.stack_sigma_spinbox.valueChanged.connect(lambda val: setattr(self, "stack_sigma", val))
+        self.stack_sigma_spinbox.valueChanged.connect(self.schedule_render)
+        clip_layout.addWidget(self.stack_weighted_checkbox)
+        clip_layout.addWidget(self.stack_clip_checkbox)
+        clip_layout.addWidget(self.stack_sigma_spinbox)
+        self.side_layout.addLayout(clip_layout)
+
     def plot_data(self, scanIndex : int, optionsKeys : list):
         "Uses ScanData and PlotData to create a matplotlib figure and refreshes the canvas"
         print("plot_data: ", scanIndex)
         self._last_scan_index = scanIndex
 
-        x = self.scanData.getScanXDataByIndex(scanIndex)
-        y_list = [self.scanData.getScanYDataByIndex(scanIndex, key) for key in optionsKeys]
-        x_label = "Channels"
+        integration = self.integration
+        if self.average:
+            integration = (self.integration, max(self.integration, self.last_integration))
+
+        if self.stack_scan_indexes is not None:
+            self.plot_stack(optionsKeys, integration)
+            return
+        if self.waterfall:
+            self.plot_waterfall(scanIndex, optionsKeys[0])
+            return
 
         # how we plot data depends on the view selected
+        plotter = spectralPlot(
+            self.scanData, scanIndex, optionsKeys, integration,
+            self.frequency_radio.isChecked(), self.xFreqRange, self.weighted
+        )
+
+        # In-place refresh of the tab's canvas
+        colours = self.show_plot(
+            plotter,
+            cache_key=(scanIndex, tuple(optionsKeys), integration, self.weighted, plotter.xlabel)
+        )
+
+        # the colors used for each line in the plot
+        self.write_spectra_to_console(optionsKeys, colours)
+
+    def stack_selected_scans(self):
+        "Show the stack of the spectral scans selected in the scan list"
+        scanIndexes = [
+            i for i in self.gfm_window.selected_scan_indexes()
+            if self.scanData.getScanDataByIndex(i).get('scanType') in self.scanTypes
+        ]
+        if not scanIndexes:
+            self.write_to_console("Select the spectral scans to stack in the scan list")
+            return
+        self.stack_scan_indexes = scanIndexes
+        self.on_option_checkbox_changed()
+
+    def plot_stack(self, optionsKeys, integration):
+        """
+        Averages the spectra of the selected keys over the scans being
+        stacked, aligned on frequency, and plots the averages.
+        """
+        start = time.perf_counter()
+        sigma = self.stack_sigma if self.stack_clip else None
+        grid = None
+        stacked = {}
+        scanIndexes = set()
+        for key in optionsKeys:
+            freqs, average, counts, used = stackScans(
+                self.scanData, self.stack_scan_indexes, key, integration,
+                self.xFreqRange, self.stack_weighted, sigma, grid
+            )
+            if freqs is None:
+                continue
+            # every key is put on the frequencies of the first
+            grid = freqs
+            stacked[key] = (average, counts)
+            scanIndexes.update(used)
+        if grid is None:
+            self.write_to_console("None of the selected scans have the selected keys")
+            return
+        self.stack = (grid, stacked, sorted(scanIndexes))
+        self.export_stack_button.setEnabled(True)
+        elapsed = time.perf_counter() - start
+        self.write_to_console(f"Stacked {len(scanIndexes)} scans in {elapsed:.3f} s")
+
+        title = f"{self.scanData.project}: stack of {len(scanIndexes)} scans"
+        colours = self.show_plot(PlotData(
+            grid,
+            [average for average, _ in stacked.values()],
+            labels=[str(key) for key in stacked],
+            xlabel="Frequency (MHz)",
+            ylabel="Counts",
+            title=title,
+            text_xy=None
+        ))
+        self.write_spectra_to_console(list(stacked), colours)
+
+    def export_stack(self):
+        "Save the last stack as a text table: frequency, then the average of each key"
+        if self.stack is None:
+            return
+        file_name, _ = QFileDialog.getSaveFileName(
+            self, "Export Stack", "stack.csv", "CSV Files (*.csv);;All Files (*)"
+        )
+        if file_name:
+            self.write_stack(file_name)
+
+    def write_stack(self, file_name):
+        "write the last stack to the given file, see export_stack"
+        grid, stacked, scanIndexes = self.stack
+        scanNums = [self.scanData.getScanNumByIndex(i) for i in scanIndexes]
+        columns = [grid] + [average for average, _ in stacked.values()]
+        header = (
+            f"stack of scans {scanNums} of {self.scanData.project}\n"
+            + ",".join(["frequency (MHz)"] + [str(key) for key in stacked])
+        )
+        np.savetxt(file_name, np.column_stack(columns), delimiter=",", header=header)
+        self.write_to_console(f"Wrote stack of {len(scanNums)} scans to {file_name}")
+
+    def plot_waterfall(self, scanIndex, key):
+        """
+        Shows every integration of the given key as an image, channels
+        (or frequency) against integration, block averaged down to about
+        the size of the axes in pixels.  The downsampled images are cached,
+        so changing the colour scale or going back to a key is only a redraw.
+        """
+        fig = self.use_canvas()
+        fig.clear()
+        ax = fig.add_subplot(111)
+        size = (int(ax.bbox.height), int(ax.bbox.width))
+
+        cache_key = (scanIndex, key, size)
+        image = self.waterfall_cache.get(cache_key)
+        if image is None:
+            image = blockAverage(self.scanData.getScanWaterfall(scanIndex, key), *size)
+            self.waterfall_cache[cache_key] = image
+            if len(self.waterfall_cache) > WATERFALL_CACHE_SIZE:
+                self.waterfall_cache.popitem(last=False)
+        else:
+            self.waterfall_cache.move_to_end(cache_key)
+
+        x = self.scanData.getScanXDataByIndex(scanIndex)
+        x_label = "Channels"
         if self.frequency_radio.isChecked():
             x_label = "Frequency (MHz)"
-            # TBF: kluge - we don't have freq. data in pickle file yet
-            # convert x data to frequency using the xFreqRange
-            x = np.asarray(x)
-            # Avoid division by zero if x is all zeros
-            x_max = x.max() if x.size > 0 else 1
-            x = self.xFreqRange[0] + (self.xFreqRange[1] - self.xFreqRange[0]) * (x / x_max)
-            y_list = [np.asarray(y)[::-1] for y in y_list]
-
-        # In-place refresh: clear only the axes, not the figure
-        if self.canvas and hasattr(self.canvas, "figure"):
-            fig = self.canvas.figure
-            if fig.axes:
-                ax = fig.axes[0]
-                ax.clear()
-            else:
-                ax = fig.add_subplot(111)
-        else:
-            from matplotlib.figure import Figure
-            fig = Figure(figsize=(4, 3))
-            ax = fig.add_subplot(111)
-            self.canvas.figure = fig
-
-        # Plot the new data
-        for y, label in zip(y_list, optionsKeys):
-            ax.plot(x, y, label=str(label))
+            x = channelsToFrequency(x, self.xFreqRange)
+            image = image[:, ::-1]
+        extent = (x[0], x[-1], 0, self.numIntegrations) if len(x) else None
+
+        im = ax.imshow(image, aspect="auto", origin="lower", extent=extent,
+                       interpolation="nearest", norm=self.get_colour_norm(image))
+        fig.colorbar(im, ax=ax, label="Counts")
         scanInfo = self.scanData.getScanDataByIndex(scanIndex)
-        title = f"{scanInfo['project']}:{scanInfo['scan']}:{self.integration}"
-        ax.set_title(title)
+        ax.set_title(f"{scanInfo['project']}:{scanInfo['scan']} {key}")
         ax.set_xlabel(x_label)
-        ax.set_ylabel("Counts")
-        ax.legend()
-        # Print 'source' in the upper right hand corner of the plot
-        ax.text(0.98, 0.98, "source", transform=ax.transAxes,
-                fontsize=12, color="black", ha="right", va="top")
-        self.canvas.draw()
-
-        # Get the colors used for each line in the plot
-        colors_used = []
-        if self.canvas and hasattr(self.canvas, "figure"):
-            for ax in self.canvas.figure.axes:
-                for line in ax.get_lines():
-                    colors_used.append(line.get_color())
-        self.write_spectra_to_console(optionsKeys, colors_used)
+        ax.set_ylabel("Integration")
+        self.toolbar.update()
+        self.canvas.draw_idle()
+
+    def get_colour_norm(self, image):
+        "the matplotlib normalization of the selected colour scale"
+        if self.colour_scale == "Log":
+            positive = image[image > 0]
+            if positive.size:
+                return LogNorm(vmin=positive.min(), vmax=positive.max(), clip=True)
+        elif self.colour_scale == "Clipped 1-99%":
+            vmin, vmax = np.nanpercentile(image, [1, 99])
+            return Normalize(vmin=vmin, vmax=vmax, clip=True)
+        return Normalize()
 
     def write_spectra_to_console(self, optionsKeys, colors):
         """
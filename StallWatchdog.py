@@ -0,0 +1,92 @@
+"A module for the StallWatchdog class"
+
+import sys
+import time
+import logging
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QTimer
+
+from Tracer import tracer
+
+logger = logging.getLogger(__name__)
+
+# how long the event loop may not run before it counts as a stall
+DEFAULT_STALL_MS = 100
+
+class StallWatchdog(QObject):
+    """
+    Detects stalls of the Qt event loop: a timer on the UI thread records
+    a heartbeat, and a watchdog thread that finds no heartbeat for longer
+    than the threshold logs the UI thread's Python stack at that moment.
+    When the event loop runs again the stall's duration is logged, and
+    recorded as a "UI stall" span, with the stack, for trace files.
+    """
+
+    def __init__(self, threshold_ms=DEFAULT_STALL_MS, parent=None):
+        super().__init__(parent)
+        self.threshold_ns = threshold_ms * 1000000
+        # beat and check often enough that a stall is seen near the threshold
+        self.interval_ms = max(threshold_ms // 4, 10)
+        self.interval_ns = self.interval_ms * 1000000
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(self.interval_ms)
+        self.heartbeat.timeout.connect(self.beat)
+
+        self.ui_thread_id = threading.get_ident()
+        self.lock = threading.Lock()
+        self.last_beat = None
+        self.stall_stack = None  # the UI thread's stack, while a stall is going on
+        self.num_stalls = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        "start watching, from the UI thread"
+        self.last_beat = time.perf_counter_ns()
+        self.heartbeat.start()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.watch, name="stall watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.heartbeat.stop()
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def beat(self):
+        "the heartbeat, the event loop is running"
+        now = time.perf_counter_ns()
+        with self.lock:
+            last = self.last_beat
+            stack = self.stall_stack
+            self.last_beat = now
+            self.stall_stack = None
+        if stack is not None:
+            # the stall started when this beat was due
+            self.report(last + self.interval_ns, now, stack)
+
+    def watch(self):
+        "the watchdog thread"
+        while not self.stopping.wait(self.interval_ms / 1000):
+            with self.lock:
+                if self.stall_stack is not None:
+                    continue
+                stalled_ns = time.perf_counter_ns() - self.last_beat - self.interval_ns
+                if stalled_ns < self.threshold_ns:
+                    continue
+                frame = sys._current_frames().get(self.ui_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "(no stack)\n"
+                self.stall_stack = stack
+            logger.warning(f"UI thread has not run for {stalled_ns / 1e6:.0f} ms, it is at:\n{stack.rstrip()}")
+
+    def report(self, start, end, stack):
+        "log and trace a stall that is over"
+        self.num_stalls += 1
+        duration_ms = (end - start) / 1e6
+        logger.warning(f"UI thread stalled for {duration_ms:.0f} ms")
+        if tracer.enabled:
+            tracer.record("UI stall", start, end, {"ms": round(duration_ms), "stack": stack})
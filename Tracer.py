@@ -0,0 +1,120 @@
+"A module for the Tracer class, and the tracer GFM records its spans with"
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import nullcontext
+
+# events kept while tracing, the oldest are dropped after that
+MAX_TRACE_EVENTS = 1000000
+
+# what span() returns while tracing is off
+NO_SPAN = nullcontext()
+
+class Span:
+    "a timed section of code, see Tracer.span"
+
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Tracer:
+    """
+    Records how long named sections of code (spans) take, on every
+    thread, and saves them in the Chrome trace event format, which
+    chrome://tracing and https://ui.perfetto.dev open as timelines.
+
+        with tracer.span("fetch scan", scan=12):
+            ...
+
+    Listeners, e.g. LatencyMonitor, are also given each span as it ends,
+    whether or not the spans are recorded for a trace file.
+    While neither is on a span is a shared do-nothing context manager.
+    """
+
+    def __init__(self, maxEvents=MAX_TRACE_EVENTS):
+        self.enabled = False  # whether spans are timed at all
+        self.recording = False  # whether spans are kept for save()
+        self.listeners = []
+        self.events = deque(maxlen=maxEvents)
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.threads = set()  # thread ids named in the trace so far
+
+    def start(self):
+        "start recording spans"
+        self.recording = True
+        self.enabled = True
+
+    def stop(self):
+        "stop recording spans, the ones recorded are kept"
+        self.recording = False
+        self.enabled = bool(self.listeners)
+
+    def addListener(self, listener):
+        "calls listener(name, start, end, args) on the thread of each span as it ends"
+        # replaced rather than changed, spans may be ending on other threads
+        self.listeners = self.listeners + [listener]
+        self.enabled = True
+
+    def removeListener(self, listener):
+        self.listeners = [l for l in self.listeners if l != listener]
+        self.enabled = self.recording or bool(self.listeners)
+
+    def span(self, name, **args):
+        "a context manager timing the code it wraps, args are shown with the span"
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, start, end, args=None):
+        "records a span from start to end, in perf_counter_ns"
+        for listener in self.listeners:
+            listener(name, start, end, args)
+        if not self.recording:
+            return
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads.add(tid)
+            self.events.append({
+                "name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                "args": {"name": threading.current_thread().name},
+            })
+        event = {
+            "name": name,
+            "cat": "gfm",
+            "ph": "X",
+            "ts": (start - self.origin) / 1000,  # microseconds
+            "dur": (end - start) / 1000,
+            "pid": self.pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = {k: str(v) for k, v in args.items()}
+        self.events.append(event)
+
+    def save(self, path):
+        "writes the spans recorded so far to a trace file, returns how many"
+        events = list(self.events)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return sum(1 for e in events if e["ph"] == "X")
+
+
+# the tracer of the application
+tracer = Tracer()
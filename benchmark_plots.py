@@ -0,0 +1,127 @@
+"compares the frames per second of the plot backends on the scans of a project"
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+from PySide6.QtWidgets import QApplication
+
+from ScanData import ScanData
+from ScanPlots import defaultScanPlot
+from GfmTab import PLOT_BACKENDS
+from PlotCache import PlotCache
+from MatplotlibPlotBackend import MatplotlibPlotBackend
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(module)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def benchmarkStepping(backend, plotters, repeat):
+    "frames per second showing one scan after the other"
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for plotter in plotters:
+            backend.show(plotter)
+            backend.render()
+    return repeat * len(plotters) / (time.perf_counter() - start)
+
+
+def benchmarkCachedStepping(backend, plotters, repeat):
+    """
+    frames per second showing one scan after the other from the backend's
+    PlotCache, after drawing each once.  Checks that every frame is a
+    cache hit that leaves updating the lines for later.
+    """
+    for i, plotter in enumerate(plotters):
+        backend.show(plotter, (i,))
+        backend.render()
+    cache = backend.plot_cache
+    hits = cache.hits
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for i, plotter in enumerate(plotters):
+            backend.show(plotter, (i,))
+            if backend.stale_plotter is not plotter:
+                raise RuntimeError(f"showing cached scan {i} updated its lines")
+    fps = repeat * len(plotters) / (time.perf_counter() - start)
+    if cache.hits - hits != repeat * len(plotters):
+        raise RuntimeError(f"{cache.hits - hits} cache hits stepping {repeat * len(plotters)} cached scans")
+    return fps
+
+
+def benchmarkPanning(backend, plotter, numFrames, fraction=0.1):
+    "frames per second panning a window of the given fraction of the x range across a scan"
+    backend.show(plotter)
+    backend.render()
+    xmin, xmax = float(plotter.x.min()), float(plotter.x.max())
+    width = fraction * (xmax - xmin)
+    step = (xmax - xmin - width) / max(numFrames - 1, 1)
+    start = time.perf_counter()
+    for i in range(numFrames):
+        backend.set_x_range(xmin + i * step, xmin + i * step + width)
+        backend.render()
+    return numFrames / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the frames per second of the GFM plot backends")
+    parser.add_argument("project", help="Name of the project")
+    parser.add_argument("--data", default="projData3.pkl",
+                        help="Project data: pickle dump, scan log or columnar directory")
+    parser.add_argument("--filter", default="",
+                        help="Only use scans matching this scan list filter, e.g. 'type:spectral'")
+    parser.add_argument("--backends", nargs="+", default=sorted(PLOT_BACKENDS), choices=sorted(PLOT_BACKENDS),
+                        help="The backends to compare")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Number of times to step through the scans")
+    parser.add_argument("--pan-frames", type=int, default=100,
+                        help="Number of frames to pan across the densest scan")
+    parser.add_argument("--size", type=int, nargs=2, default=(1000, 600), metavar=("WIDTH", "HEIGHT"),
+                        help="Size of the plot widget in pixels")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    scanData = ScanData(args.data, args.project)
+    scanIndexes = scanData.filterIndex.query(args.filter)
+    scanIndexes = range(scanData.numScans) if scanIndexes is None else sorted(scanIndexes)
+    if not scanIndexes:
+        logger.warning(f"No scans of {args.project} match '{args.filter}'")
+        sys.exit(0)
+    # the data is read and prepared once, only drawing is timed
+    plotters = [defaultScanPlot(scanData, i) for i in scanIndexes]
+    densest = max(plotters, key=lambda p: len(p.x))
+
+    results = {}
+    for name in args.backends:
+        backend = PLOT_BACKENDS[name]()
+        widget = backend.widget()
+        widget.resize(*args.size)
+        widget.show()
+        app.processEvents()
+        stepping = benchmarkStepping(backend, plotters, args.repeat)
+        panning = benchmarkPanning(backend, densest, args.pan_frames)
+        results[name] = (stepping, panning)
+        widget.close()
+        app.processEvents()
+
+    # the tabs' matplotlib canvases restore plots drawn before from a PlotCache
+    backend = MatplotlibPlotBackend(PlotCache())
+    widget = backend.widget()
+    widget.resize(*args.size)
+    widget.show()
+    app.processEvents()
+    cached = benchmarkCachedStepping(backend, plotters, args.repeat)
+    widget.close()
+    app.processEvents()
+
+    print(f"{len(plotters)} scans, densest has {len(densest.x)} points, {args.size[0]}x{args.size[1]} pixels")
+    print(f"{'backend':<12} {'stepping fps':>14} {'panning fps':>14}")
+    for name, (stepping, panning) in results.items():
+        print(f"{name:<12} {stepping:>14.1f} {panning:>14.1f}")
+    print(f"{'cached':<12} {cached:>14.1f}")
+    scanData.close()
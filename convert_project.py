@@ -0,0 +1,65 @@
+"converts legacy GFM pickle dumps into the columnar memory mapped layout"
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+import numpy as np
+
+from ScanStore import COLUMNAR_SUFFIX
+from ScanStore import SCAN_LOG_SUFFIX
+from ScanStore import ScanLogStore
+from ScanStore import loadLegacyPickle
+from ScanStore import writeColumnarStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(module)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def readRecords(path, project):
+    "returns the raw scan records of the project from a pickle dump or scan log"
+    if path.endswith(SCAN_LOG_SUFFIX):
+        store = ScanLogStore(path, project)
+        records = []
+        for i in range(store.numScans):
+            record = dict(store.getScanMeta(i))
+            record.update(store.loadScanPayload(i))
+            records.append(record)
+        store.close()
+        return records
+    data = loadLegacyPickle(path)
+    if project not in data:
+        raise ValueError(f"project {project} not in {path}, found: {list(data.keys())}")
+    return data[project]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a GFM pickle dump to the columnar layout")
+    parser.add_argument("source", help="Legacy pickle file (or scan log) to convert")
+    parser.add_argument("project", help="Name of the project")
+    parser.add_argument("-o", "--output",
+                        help=f"Output directory (default: <project>{COLUMNAR_SUFFIX} next to the source)")
+    parser.add_argument("--float32", action="store_true",
+                        help="Store the data series as float32 instead of float64, halving their size")
+    args = parser.parse_args()
+
+    output = args.output
+    if output is None:
+        output = os.path.join(os.path.dirname(args.source), args.project + COLUMNAR_SUFFIX)
+
+    start = time.perf_counter()
+    try:
+        records = readRecords(args.source, args.project)
+    except ValueError as e:
+        logger.error(e)
+        sys.exit(1)
+    dtype = np.float32 if args.float32 else np.float64
+    numArrays, numFixed = writeColumnarStore(output, records, args.project, dtype)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Wrote {len(records)} scans ({numArrays} arrays) to {output} in {elapsed:.2f} s")
+    logger.info(f"{numFixed} of {len(records)} records needed fixing")
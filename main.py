@@ -4,9 +4,14 @@ import sys
 import logging
 import argparse
 
+import numpy as np
+
 from PySide6.QtWidgets import QApplication
 
 from GfmWindow import GfmWindow
+from GfmTab import PLOT_BACKENDS
+from Tracer import tracer
+from StallWatchdog import StallWatchdog, DEFAULT_STALL_MS
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(module)s - %(message)s'
@@ -15,9 +20,43 @@ logging.basicConfig(
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="GFM Application")
     parser.add_argument("project", help="Name of the project")
+    parser.add_argument("--data", default="projData3.pkl",
+                        help="Project data: pickle dump, scan log or columnar directory")
+    parser.add_argument("--float32", action="store_true",
+                        help="Keep data series as float32 to halve their memory use")
+    parser.add_argument("--cache-mb", type=int, default=512,
+                        help="Memory budget of the scan cache in MB")
+    parser.add_argument("--read-ahead", type=int, default=2,
+                        help="Number of scans before and after the selected one to read ahead")
+    parser.add_argument("--follow", action="store_true",
+                        help="Watch the project data (a scan log) for newly written scans")
+    parser.add_argument("--plot-backend", default="matplotlib", choices=sorted(PLOT_BACKENDS),
+                        help="What the continuum and spectral tabs draw their line plots with")
+    parser.add_argument("--perf", action="store_true",
+                        help="Show how long each selection took to fetch, plot and draw in the status bar")
+    parser.add_argument("--stall-ms", type=int, default=DEFAULT_STALL_MS,
+                        help="Log the UI thread's stack when the event loop doesn't run for this long, 0 to not watch")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Record tracing spans and write them to PATH (Chrome trace JSON) on exit")
     args = parser.parse_args()
+    if args.trace:
+        tracer.start()
 
     app = QApplication(sys.argv)
-    window = GfmWindow(args.project, app)
+    scan_data_options = {
+        "dtype": np.float32 if args.float32 else None,
+        "cacheBytes": args.cache_mb * 1024 * 1024,
+        "readAhead": args.read_ahead,
+    }
+    window = GfmWindow(args.project, app, args.data, scan_data_options, args.follow, args.plot_backend, args.perf)
     window.show()
-    sys.exit(app.exec())
+    watchdog = StallWatchdog(args.stall_ms) if args.stall_ms > 0 else None
+    if watchdog is not None:
+        watchdog.start()
+    status = app.exec()
+    if watchdog is not None:
+        watchdog.stop()
+    if args.trace:
+        tracer.save(args.trace)
+        logging.info(f"wrote trace to {args.trace}")
+    sys.exit(status)
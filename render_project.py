@@ -0,0 +1,113 @@
+"renders a plot of every scan of a project to image files, without the GUI"
+
+import os
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from ScanData import ScanData
+from ScanPlots import drawScanPlot
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(module)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# the ScanData of each worker process, opened once by initWorker
+workerScanData = None
+workerOptions = None
+
+
+def initWorker(data_file, project, options):
+    "opens the project in a worker process"
+    global workerScanData, workerOptions
+    # the workers go through the scans once, nothing to cache or read ahead
+    workerScanData = ScanData(data_file, project, cacheBytes=0, readAhead=0)
+    workerOptions = options
+
+
+def renderScan(scanData, scanIndex, path, figsize=(8, 6), dpi=100):
+    "draws the default plot of a scan with Agg and saves it, the format is given by the extension"
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    drawScanPlot(fig, scanData, scanIndex)
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def renderWorker(scanIndex):
+    "renders one scan in a worker process, returns (scan index, output path, error)"
+    scanNum = workerScanData.getScanNumByIndex(scanIndex)
+    path = os.path.join(
+        workerOptions["output"],
+        f"{workerScanData.project}_{scanNum:04d}.{workerOptions['format']}"
+    )
+    try:
+        renderScan(workerScanData, scanIndex, path, workerOptions["figsize"], workerOptions["dpi"])
+    except Exception as e:
+        return scanIndex, None, str(e)
+    return scanIndex, path, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a plot of every scan of a GFM project")
+    parser.add_argument("project", help="Name of the project")
+    parser.add_argument("--data", default="projData3.pkl",
+                        help="Project data: pickle dump, scan log or columnar directory")
+    parser.add_argument("-o", "--output", default=".",
+                        help="Directory the plots are written to")
+    parser.add_argument("--format", default="png", choices=["png", "pdf", "svg"],
+                        help="Output file format")
+    parser.add_argument("--filter", default="",
+                        help="Only render scans matching this scan list filter, e.g. 'type:Peak scan:400-600'")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: number of cores)")
+    parser.add_argument("--dpi", type=int, default=100,
+                        help="Resolution of the plots")
+    parser.add_argument("--size", type=float, nargs=2, default=(8, 6), metavar=("WIDTH", "HEIGHT"),
+                        help="Size of the plots in inches")
+    args = parser.parse_args()
+
+    # read the scan index once here: this also builds the scan log cache of a
+    # pickle dump, which the workers then share
+    scanData = ScanData(args.data, args.project, cacheBytes=0, readAhead=0)
+    scanIndexes = scanData.filterIndex.query(args.filter)
+    scanIndexes = range(scanData.numScans) if scanIndexes is None else sorted(scanIndexes)
+    scanData.close()
+    if not scanIndexes:
+        logger.warning(f"No scans of {args.project} match '{args.filter}'")
+        sys.exit(0)
+
+    os.makedirs(args.output, exist_ok=True)
+    options = {
+        "output": args.output,
+        "format": args.format,
+        "figsize": tuple(args.size),
+        "dpi": args.dpi,
+    }
+    jobs = max(1, min(args.jobs, len(scanIndexes)))
+    logger.info(f"Rendering {len(scanIndexes)} scans of {args.project} with {jobs} processes")
+
+    start = time.perf_counter()
+    numFailed = 0
+    with multiprocessing.Pool(jobs, initWorker, (args.data, args.project, options)) as pool:
+        # small chunks keep every worker busy until the end
+        chunksize = max(1, len(scanIndexes) // (8 * jobs))
+        for scanIndex, path, error in pool.imap_unordered(renderWorker, scanIndexes, chunksize):
+            if error is None:
+                print(path, flush=True)
+            else:
+                numFailed += 1
+                logger.error(f"Scan index {scanIndex} failed: {error}")
+    elapsed = time.perf_counter() - start
+    numDone = len(scanIndexes) - numFailed
+    logger.info(f"Rendered {numDone} scans in {elapsed:.2f} s, {numDone / elapsed:.1f} scans/s")
+    if numFailed:
+        logger.error(f"{numFailed} scans failed")
+        sys.exit(1)
@@ -0,0 +1,54 @@
+"appends the scans of a project to a scan log one at a time, a stand-in for the telescope feed"
+
+import os
+import time
+import logging
+import argparse
+
+from ScanStore import appendScanRecord
+from ScanStore import writeScanLogHeader
+from convert_project import readRecords
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(module)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def writeScans(records, path, interval, first=0):
+    """
+    appends the records to the scan log at path, creating it if needed,
+    waiting interval seconds before each one.  The first records are
+    written right away, so a project can start with some scans in it.
+    """
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'ab') as f:
+        if new:
+            # records are normalized as they are appended, none counted as fixed
+            writeScanLogHeader(f)
+            f.flush()
+        for i, record in enumerate(records):
+            if i >= first:
+                time.sleep(interval)
+            appendScanRecord(f, record)
+            # readers only index complete records, so flush each one
+            f.flush()
+            logger.info(f"wrote scan {record.get('scan')} ({i + 1} of {len(records)}) to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append the scans of a project to a scan log, one at a time")
+    parser.add_argument("data", help="Project data to copy the scans from: pickle dump or scan log")
+    parser.add_argument("project", help="Name of the project")
+    parser.add_argument("-o", "--output", help="Scan log to append to (default: <project>.scans)")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="Seconds between scans")
+    parser.add_argument("--first", type=int, default=1,
+                        help="Number of scans written right away")
+    args = parser.parse_args()
+
+    output = args.output or f"{args.project}.scans"
+    records = readRecords(args.data, args.project)
+    logger.info(f"Writing {len(records)} scans of {args.project} to {output}, one every {args.interval} s")
+    writeScans(records, output, args.interval, args.first)